@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk CSV import (expense_import) against one-at-a-time entry.
+
+    python benchmarks/bench_expense_import.py [--accounts 2000] [--rows 250]
+
+Writes --accounts statement files of --rows expenses each (a year of card
+activity), then times
+  per row   the add_expense path: strptime to validate each date, store.add
+            and one fsync'd journal line per expense (timed on
+            --per-row-sample rows and extrapolated)
+  import    Importer.read over every file, commit(), then one snapshot
+  re-import the same files again, where every row is a duplicate
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import expense_import  # noqa: E402
+import expense_store  # noqa: E402
+
+CATEGORIES = ["Food", "Rent", "Transport", "Utilities", "Travel", "Health", "Fun", ""]
+PAYEES = [f"Merchant {i}" for i in range(500)]
+
+
+def write_statements(tmp: str, accounts: int, rows: int, seed: int = 1):
+    rnd = random.Random(seed)
+    base = date(2024, 1, 1).toordinal()
+    paths = []
+    for a in range(accounts):
+        path = os.path.join(tmp, f"account-{a:05d}.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Posted Date,Payee,Amount,Category\n")
+            for _ in range(rows):
+                when = date.fromordinal(base + rnd.randrange(366)).strftime("%m/%d/%Y")
+                f.write(f"{when},{rnd.choice(PAYEES)} #{a},{rnd.randint(100, 50000) / 100},"
+                        f"{rnd.choice(CATEGORIES)}\n")
+        paths.append(path)
+    return paths
+
+
+def per_row(paths, sample: int, journal: str) -> float:
+    """Seconds per expense entered the way add_expense does it."""
+    store = expense_store.ExpenseStore()
+    done = 0
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            next(f)
+            for line in f:
+                when, payee, amount, category = line.rstrip("\n").split(",")
+                d = datetime.strptime(when, "%m/%d/%Y").strftime("%m-%d-%Y")
+                expense = {"date": d, "category": category or "Uncategorized",
+                           "amount": float(amount), "description": payee}
+                store.add(expense)
+                expense_store.append_journal(journal, [{"expense": expense}])
+                done += 1
+                if done == sample:
+                    return (time.perf_counter() - start) / done
+    return (time.perf_counter() - start) / max(done, 1)
+
+
+def bulk(paths, store, snapshot: str):
+    importer = expense_import.Importer(store)
+    start = time.perf_counter()
+    added = dupes = 0
+    for path in paths:
+        result = importer.read(path)
+        added += result.added
+        dupes += result.duplicates
+    t_read = time.perf_counter() - start
+    importer.commit()
+    expense_store.write_snapshot(snapshot, store, {})
+    return t_read, time.perf_counter() - start, added, dupes
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--accounts", type=int, default=2000)
+    p.add_argument("--rows", type=int, default=250, help="Expenses per account")
+    p.add_argument("--per-row-sample", type=int, default=2000)
+    args = p.parse_args()
+    total = args.accounts * args.rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_statements(tmp, args.accounts, args.rows)
+        print(f"{args.accounts} files, {total} expenses\n")
+        print(f"{'path':>10}  {'read':>9}  {'total':>9}  {'rows/s':>10}  {'new':>8}  {'dupes':>8}")
+
+        t = per_row(paths, args.per_row_sample, os.path.join(tmp, "per-row.jsonl"))
+        print(f"{'per row':>10}  {'':>9}  {t * total:8.1f}s  {1 / t:10,.0f}  {'':>8}  {'':>8}"
+              f"  (extrapolated from {args.per_row_sample} rows)")
+
+        store = expense_store.ExpenseStore()
+        snapshot = os.path.join(tmp, "expenses.snapshot")
+        for label in ("import", "re-import"):
+            t_read, t_all, added, dupes = bulk(paths, store, snapshot)
+            print(f"{label:>10}  {t_read:8.2f}s  {t_all:8.2f}s  {total / t_all:10,.0f}"
+                  f"  {added:8}  {dupes:8}")
+        assert len(store) == total
+
+
+if __name__ == "__main__":
+    main()
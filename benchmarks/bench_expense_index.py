@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark expense_store.DateIndex date-range queries against full scans.
+
+    python benchmarks/bench_expense_index.py [--rows 5000000] [--categories 50] [--queries 200]
+
+Builds --rows synthetic expenses over five years straight into an
+ExpenseStore, then times --queries random queries of each kind:
+  range sum     total spent between two dates (all categories)
+  cat range     the same for one category
+  month budget  one category's spending in one month (budget status)
+  week rows     the rows of one week, in date order
+answered by
+  scan      ExpenseStore.range_sum / a row filter, plain loops over arrays
+  numpy     the same with NumPy (skipped if missing)
+  index     store.index: bisect over sorted dates and daily prefix sums,
+            dict lookups for month totals
+Times are per query; "build" is the one-off cost of the first store.index.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import expense_store  # noqa: E402
+
+NUMPY = expense_store.np
+BASE = date(2020, 1, 1).toordinal()
+DAYS = 5 * 365
+
+
+def make_store(n: int, categories: int, seed: int = 1) -> expense_store.ExpenseStore:
+    s = expense_store.ExpenseStore()
+    for i in range(categories):
+        s.category_code(f"Category {i}")
+    if NUMPY is not None:
+        rng = NUMPY.random.default_rng(seed)
+        s.amounts = array("d", (rng.integers(1, 50000, n) / 100).tobytes())
+        s.dates = array("i", (BASE + rng.integers(0, DAYS, n)).astype(NUMPY.int32).tobytes())
+        s.cats = array("I", rng.integers(0, categories, n).astype(NUMPY.uint32).tobytes())
+    else:
+        rnd = random.Random(seed)
+        s.amounts = array("d", (rnd.randint(1, 50000) / 100 for _ in range(n)))
+        s.dates = array("i", (BASE + rnd.randrange(DAYS) for _ in range(n)))
+        s.cats = array("I", (rnd.randrange(categories) for _ in range(n)))
+    s.descriptions = [""] * n
+    return s
+
+
+def make_queries(count: int, categories: int, seed: int = 2):
+    rnd = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        start = BASE + rnd.randrange(DAYS - 400)
+        end = start + rnd.randint(1, 400)
+        month = date.fromordinal(BASE + rnd.randrange(DAYS))
+        week = BASE + rnd.randrange(DAYS - 7)
+        queries.append((start, end, f"Category {rnd.randrange(categories)}", month, week))
+    return queries
+
+
+def month_bounds(d: date):
+    first = d.replace(day=1)
+    nxt = date(d.year + d.month // 12, d.month % 12 + 1, 1)
+    return first.toordinal(), nxt.toordinal() - 1
+
+
+def scan_rows(s, start, end):
+    """Row numbers between two dates, in date order, without the index."""
+    if expense_store.np is not None:
+        _, dates, _ = s._views()
+        rows = expense_store.np.flatnonzero((dates >= start) & (dates <= end))
+        return rows[expense_store.np.argsort(dates[rows], kind="stable")].tolist()
+    return sorted((i for i, d in enumerate(s.dates) if start <= d <= end),
+                  key=s.dates.__getitem__)
+
+
+SCAN = {
+    "range sum": lambda s, q: s.range_sum(q[0], q[1]),
+    "cat range": lambda s, q: s.range_sum(q[0], q[1], q[2]),
+    "month budget": lambda s, q: s.range_sum(*month_bounds(q[3]), q[2]),
+    "week rows": lambda s, q: scan_rows(s, q[4], q[4] + 6),
+}
+
+INDEX = {
+    "range sum": lambda s, q: s.index.spent_between(q[0], q[1]),
+    "cat range": lambda s, q: s.index.spent_between(q[0], q[1], q[2]),
+    "month budget": lambda s, q: s.index.month_total(q[3].year, q[3].month, q[2]),
+    "week rows": lambda s, q: s.index.rows_between(q[4], q[4] + 6).tolist(),
+}
+
+
+def per_query(fn, s, queries):
+    start = time.perf_counter()
+    results = [fn(s, q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--rows", type=int, default=5000000)
+    p.add_argument("--categories", type=int, default=50)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--scan-queries", type=int, default=5,
+                   help="Queries timed for the (slow) pure-Python scan")
+    args = p.parse_args()
+
+    s = make_store(args.rows, args.categories)
+    queries = make_queries(args.queries, args.categories)
+
+    start = time.perf_counter()
+    s.index
+    build = time.perf_counter() - start
+    s._index = None
+    tracemalloc.start()
+    s.index
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{args.rows} rows, {args.categories} categories: "
+          f"index build {build:.2f}s, {mem / 1e6:.0f}MB ({mem / args.rows:.1f} B/row)\n")
+
+    paths = [("scan", SCAN, None, queries[:args.scan_queries])]
+    if NUMPY is not None:
+        paths.append(("numpy", SCAN, NUMPY, queries))
+    paths.append(("index", INDEX, NUMPY, queries))
+
+    print(f"{'path':>6}" + "".join(f"  {name:>13}" for name in INDEX))
+    reference = {}
+    for name, reports, np, qs in paths:
+        expense_store.np = np
+        row = []
+        for report, fn in reports.items():
+            t, results = per_query(fn, s, qs)
+            ref = reference.setdefault(report, results)
+            for got, want in zip(results, ref):  # same answers, up to summation order
+                if isinstance(want, float):
+                    assert abs(got - want) < 1e-6 * abs(want) + 1e-6, (report, got, want)
+                else:
+                    assert got == want, report
+            row.append(t)
+        print(f"{name:>6}" + "".join(f"  {t * 1000:11.3f}ms" for t in row))
+    expense_store.np = NUMPY
+
+
+if __name__ == "__main__":
+    main()
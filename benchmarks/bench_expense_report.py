@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark expense_report.py over many users' expense data.
+
+    python benchmarks/bench_expense_report.py [--users 400] [--rows 5000] [--workers 1 2 4]
+
+Writes --users synthetic users, half as legacy expenses.json and half as
+expenses.snapshot + expenses.jsonl, each with --rows expenses over two
+years and a few budgets. It then times the cross-user report for each
+--workers count, checking that the merged totals agree. "shard p50/max" is
+the per-shard time, and "peak RSS" the largest resident set of the parent
+and of any worker (ru_maxrss), which stays flat as --users grows.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import expense_report  # noqa: E402
+import expense_store  # noqa: E402
+
+CATEGORIES = ["Food", "Rent", "Transport", "Utilities", "Travel", "Health", "Fun", "Misc"]
+MONTH = "2024-06"
+
+
+def write_users(tmp: str, users: int, rows: int, seed: int = 1) -> None:
+    rnd = random.Random(seed)
+    base = date(2023, 1, 1).toordinal()
+    for u in range(users):
+        home = os.path.join(tmp, f"user{u:05d}")
+        os.mkdir(home)
+        expenses = [{"date": expense_store.format_date(base + rnd.randrange(730)),
+                     "category": rnd.choice(CATEGORIES),
+                     "amount": rnd.randint(100, 20000) / 100,
+                     "description": "" if rnd.random() < 0.7 else "note"}
+                    for _ in range(rows)]
+        budget = {cat: float(rnd.randint(100, 3000)) for cat in rnd.sample(CATEGORIES, 3)}
+        if u % 2:
+            with open(os.path.join(home, "expenses.json"), "w") as f:
+                json.dump({"expenses": expenses, "budget": budget}, f, indent=4)
+        else:
+            tail = expenses[-rows // 10:]
+            store = expense_store.ExpenseStore.from_dicts(expenses[:len(expenses) - len(tail)])
+            expense_store.write_snapshot(os.path.join(home, "expenses.snapshot"), store, budget)
+            expense_store.append_journal(os.path.join(home, "expenses.jsonl"),
+                                         [{"expense": e} for e in tail])
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--users", type=int, default=400)
+    p.add_argument("--rows", type=int, default=5000, help="Expenses per user")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_users(tmp, args.users, args.rows)
+        shards = list(expense_report.find_shards([tmp]))
+        print(f"{len(shards)} users, {args.rows} expenses each, {os.cpu_count()} core(s)\n")
+        print(f"{'workers':>7}  {'wall':>8}  {'users/s':>8}  {'shard p50':>9}  {'max':>8}  "
+              f"{'peak RSS':>8}")
+        reference = None
+        for workers in args.workers:
+            report, seconds = expense_report.Report(), []
+            start = time.perf_counter()
+            for result in expense_report.map_shards(shards, MONTH, workers):
+                assert result.error is None, result.error
+                report.merge(result)
+                seconds.append(result.seconds)
+            wall = time.perf_counter() - start
+            merged = report.to_dict()
+            if reference is None:
+                reference = merged
+            else:
+                assert merged.keys() == reference.keys()
+                for cat, row in merged["categories"].items():
+                    want = reference["categories"][cat]
+                    assert abs(row["spent"] - want["spent"]) < 1e-6 * want["spent"] + 1e-6
+                    assert row["over_budget_users"] == want["over_budget_users"]
+            seconds.sort()
+            rss = max(resource.getrusage(who).ru_maxrss
+                      for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+            print(f"{workers:>7}  {wall:7.2f}s  {len(shards) / wall:8.0f}  "
+                  f"{seconds[len(seconds) // 2] * 1000:7.1f}ms  {seconds[-1] * 1000:6.1f}ms  "
+                  f"{rss / 1024:6.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
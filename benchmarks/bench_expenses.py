@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark expense reports: the original list of dicts vs expense_store.
+
+    python benchmarks/bench_expenses.py [--rows 100000 1000000] [--categories 50]
+
+For each size it builds the same synthetic expenses as
+  dicts    a list of {"date": "MM-DD-YYYY", ...} dicts, reports as loops
+  arrays   expense_store.ExpenseStore with NumPy disabled (plain loops
+           over array columns)
+  numpy    expense_store.ExpenseStore with NumPy (skipped if missing)
+and times totals by category, totals by (category, month), top-10
+categories in a date range, and a one-category date-range sum.
+"mem/row" is the memory held by the expenses (tracemalloc).
+
+A second table compares persistence at --persist-rows rows: the original
+expenses.json (json.dump with indent=4 per save, json.load of the whole
+document) against the snapshot + journal (one fsync'd journal line per
+added expense, array.fromfile snapshot load). "peak" is the load's peak
+traced memory.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import expense_store  # noqa: E402
+
+NUMPY = expense_store.np
+
+
+def make_expenses(n: int, categories: int, seed: int = 1):
+    rnd = random.Random(seed)
+    base = date(2020, 1, 1).toordinal()
+    names = [f"Category {i}" for i in range(categories)]
+    for _ in range(n):
+        yield {"date": expense_store.format_date(base + rnd.randint(0, 5 * 365)),
+               "category": rnd.choice(names),
+               "amount": rnd.randint(1, 50000) / 100,
+               "description": "" if rnd.random() < 0.8 else "note"}
+
+
+# -- the dict-list path, the way expense_tracker.py summed ------------------
+
+def _ymd(d):
+    """'MM-DD-YYYY' -> 'YYYY-MM-DD', which compares in date order."""
+    return f"{d[6:]}-{d[:2]}-{d[3:5]}"
+
+
+def dict_by_category(expenses, start=None, end=None):
+    spent = {}
+    for exp in expenses:
+        if start is None or start <= _ymd(exp["date"]) <= end:
+            spent[exp["category"]] = spent.get(exp["category"], 0) + exp["amount"]
+    return spent
+
+
+def dict_by_month(expenses):
+    spent = {}
+    for exp in expenses:
+        key = (exp["category"], f"{exp['date'][6:]}-{exp['date'][:2]}")
+        spent[key] = spent.get(key, 0) + exp["amount"]
+    return spent
+
+
+def dict_top(expenses, n, start, end):
+    totals = dict_by_category(expenses, _ymd(start), _ymd(end))
+    return sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+def dict_range_sum(expenses, start, end, category):
+    start, end = _ymd(start), _ymd(end)
+    return sum(exp["amount"] for exp in expenses
+               if exp["category"] == category and start <= _ymd(exp["date"]) <= end)
+
+
+DICT_REPORTS = {
+    "by category": dict_by_category,
+    "by month": dict_by_month,
+    "top 10": lambda e: dict_top(e, 10, "01-01-2022", "06-30-2023"),
+    "range sum": lambda e: dict_range_sum(e, "01-01-2022", "06-30-2023", "Category 3"),
+}
+
+STORE_REPORTS = {
+    "by category": lambda s: s.totals_by_category(),
+    "by month": lambda s: s.totals_by_month(),
+    "top 10": lambda s: s.top_categories(10, "01-01-2022", "06-30-2023"),
+    "range sum": lambda s: s.range_sum("01-01-2022", "06-30-2023", "Category 3"),
+}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def memory(build):
+    tracemalloc.start()
+    obj = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used, obj
+
+
+def bench_persistence(n: int, categories: int):
+    expenses = list(make_expenses(n, categories))
+    store = expense_store.ExpenseStore.from_dicts(expenses)
+    print(f"\n{'rows':>9}  {'format':>9}  {'save 1 more':>12}  {'load':>9}  {'peak':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "expenses.json")
+        snap = os.path.join(tmp, "expenses.snapshot")
+        journal = os.path.join(tmp, "expenses.jsonl")
+
+        def dump():
+            with open(legacy, "w") as f:
+                json.dump({"expenses": expenses, "budget": {}}, f, indent=4)
+
+        def load_legacy():
+            with open(legacy) as f:
+                return expense_store.ExpenseStore.from_dicts(json.load(f)["expenses"])
+
+        def load_new():
+            s, budget = expense_store.read_snapshot(snap)
+            expense_store.replay_journal(journal, s, budget)
+            return s
+
+        t_dump, _ = timed(dump)
+        expense_store.write_snapshot(snap, store, {})
+        t_append, _ = timed(expense_store.append_journal, journal, [{"expense": expenses[0]}])
+        for name, save, load in (("json", t_dump, load_legacy), ("snapshot", t_append, load_new)):
+            t_load, loaded = timed(load)
+            del loaded
+            tracemalloc.start()
+            load()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{n:>9}  {name:>9}  {save * 1000:10.1f}ms  {t_load:8.2f}s  {peak / 1e6:7.0f}MB")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    p.add_argument("--categories", type=int, default=50)
+    p.add_argument("--persist-rows", type=int, default=1000000)
+    args = p.parse_args()
+
+    print(f"{'rows':>9}  {'path':>6}  {'mem/row':>8}" +
+          "".join(f"  {name:>11}" for name in DICT_REPORTS))
+    for n in args.rows:
+        mem_dicts, expenses = memory(lambda: list(make_expenses(n, args.categories)))
+        mem_store, store = memory(lambda: expense_store.ExpenseStore.from_dicts(expenses))
+        paths = [("dicts", mem_dicts, expenses, DICT_REPORTS, NUMPY),
+                 ("arrays", mem_store, store, STORE_REPORTS, None)]
+        if NUMPY is not None:
+            paths.append(("numpy", mem_store, store, STORE_REPORTS, NUMPY))
+        reference = None
+        for name, mem, data, reports, np in paths:
+            expense_store.np = np
+            times, results = zip(*(timed(fn, data) for fn in reports.values()))
+            if reference is None:
+                reference = results
+            else:  # same answers, up to float summation order
+                assert results[1].keys() == reference[1].keys()
+                assert [k for k, _ in results[2]] == [k for k, _ in reference[2]]
+                assert abs(results[3] - reference[3]) < 1e-6 * abs(reference[3]) + 1e-9
+            print(f"{n:>9}  {name:>6}  {mem / n:6.0f} B" +
+                  "".join(f"  {t * 1000:9.1f}ms" for t in times))
+        expense_store.np = NUMPY
+        del expenses, store
+
+    bench_persistence(args.persist_rows, args.categories)
+
+
+if __name__ == "__main__":
+    main()
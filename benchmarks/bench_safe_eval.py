@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the iterative safe_eval engine against the recursive AST path.
+
+    python benchmarks/bench_safe_eval.py [--terms 100 1000 10000 100000]
+
+For each size it times a generated 1+2+3+...+n style expression through:
+  recursive  ast.parse + the recursive _eval walk (the original engine)
+  cold       safe_eval.evaluate with an empty cache (tokenize + parse + run)
+  cached     safe_eval.evaluate on a cache hit (run only)
+
+It then compares numeric backends (float, decimal, fraction) by throughput
+over a set of distinct money-style formulas. "cold" includes literal
+conversion and the arithmetic itself (constant folding); "cached" is the
+per-call overhead once a formula has been compiled.
+"""
+import argparse
+import ast
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "python_calculator_app"))
+import safe_eval  # noqa: E402
+
+
+def make_expr(terms: int) -> str:
+    ops = "+-*"
+    parts = [str(i % 97 + 1) for i in range(terms)]
+    return "".join(p + ops[i % 3] for i, p in enumerate(parts[:-1])) + parts[-1]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def recursive(expr: str):
+    return safe_eval._eval(ast.parse(expr, mode="eval"))
+
+
+def cold(expr: str):
+    safe_eval.cache_clear()
+    return safe_eval.evaluate(expr)
+
+
+def money_exprs(count: int, seed: int = 1):
+    rnd = random.Random(seed)
+
+    def amount():
+        return f"{rnd.randint(0, 9999)}.{rnd.randint(0, 99):02d}"
+
+    return [f"({amount()} * {rnd.randint(1, 12)} + {amount()}) / {rnd.randint(1, 50)}"
+            f" - {amount()} * {rnd.randint(1, 7)}"
+            for _ in range(count)]
+
+
+def bench_backends(count: int, repeat: int):
+    exprs = money_exprs(count)
+    print(f"\n{'backend':>8}  {'cold evals/s':>13}  {'cached evals/s':>15}")
+    for name in ("float", "decimal", "fraction"):
+        def run():
+            for e in exprs:
+                safe_eval.evaluate(e, backend=name)
+
+        def run_cold():
+            safe_eval.cache_clear()
+            run()
+
+        t_cold = best_of(run_cold, repeat)
+        run()
+        t_hot = best_of(run, repeat)
+        print(f"{name:>8}  {count / t_cold:13,.0f}  {count / t_hot:15,.0f}")
+
+
+def fmt(seconds) -> str:
+    return f"{seconds * 1000:10.3f} ms" if isinstance(seconds, float) else f"{seconds:>13}"
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--terms", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--formulas", type=int, default=2000,
+                   help="Distinct formulas for the backend comparison")
+    args = p.parse_args()
+
+    print(f"{'terms':>8}  {'recursive':>13}  {'cold':>13}  {'cached':>13}")
+    for n in args.terms:
+        expr = make_expr(n)
+        try:
+            expected = recursive(expr)
+            t_rec = best_of(lambda: recursive(expr), args.repeat)
+        except (RecursionError, MemoryError):
+            expected, t_rec = None, "RecursionError"
+        t_cold = best_of(lambda: cold(expr), args.repeat)
+        safe_eval.evaluate(expr)
+        t_hot = best_of(lambda: safe_eval.evaluate(expr), args.repeat)
+        if expected is not None:
+            assert safe_eval.evaluate(expr) == expected
+        print(f"{n:>8}  {fmt(t_rec)}  {fmt(t_cold)}  {fmt(t_hot)}")
+
+    bench_backends(args.formulas, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark task_manager.py login against a large user base.
+
+    python benchmarks/bench_task_manager.py [--users 1000000] [--iterations 200000]
+
+Builds a users.txt in the original plaintext format and a users.db with the
+same users, then times logins for users spread through the file:
+  users.txt   the original login: scan the file line by line
+  lookup      UserStore's indexed fetch of one user's hash
+  login       UserStore.authenticate: lookup plus one PBKDF2 key derivation
+
+The bulk users are hashed at 1 iteration so the database builds quickly;
+the probed users are hashed at --iterations, which is what login pays for.
+
+Migrating a real users.txt (UserStore.import_legacy) pays that same key
+derivation for every user, so it times importing --import-users users at
+--iterations and extrapolates to --users. At the default 200000 iterations
+that measured ~125 ms per user, about 35 hours for a million users on one
+core; the import commits every IMPORT_CHUNK users and skips users already
+imported, so it can be stopped and restarted.
+
+Finally it provisions --tasks tasks for one user one call at a time
+(append_task: lock, append, fsync each) and in one TaskSession (one flush).
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import task_manager  # noqa: E402
+
+
+def scan_login(path, username, password):
+    with open(path, "r") as f:
+        for line in f:
+            stored_user, stored_pass = line.strip().split(",")
+            if stored_user == username and stored_pass == password:
+                return username
+    return None
+
+
+def median_ms(fn, names):
+    times = []
+    for name in names:
+        start = time.perf_counter()
+        fn(name)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--users", type=int, default=1_000_000)
+    p.add_argument("--iterations", type=int, default=task_manager.KDF_ITERATIONS,
+                   help="PBKDF2 iterations for the probed users")
+    p.add_argument("--probes", type=int, default=20)
+    p.add_argument("--import-users", type=int, default=50,
+                   help="Legacy users to import (timed at --iterations)")
+    p.add_argument("--tasks", type=int, default=10000, help="Tasks to provision")
+    args = p.parse_args()
+    task_manager.KDF_ITERATIONS = args.iterations
+
+    n = args.users
+    probes = [f"user{n * (k + 1) // (args.probes + 1)}" for k in range(args.probes)]
+    with tempfile.TemporaryDirectory() as tmp:
+        txt = os.path.join(tmp, "users.txt")
+        with open(txt, "w") as f:
+            f.writelines(f"user{i},pw{i}\n" for i in range(n))
+        start = time.perf_counter()
+        users = task_manager.UserStore(os.path.join(tmp, "users.db"))
+        cheap = task_manager.hash_password("bulk", iterations=1)
+        wanted = set(probes)
+        users.add_hashed((f"user{i}", cheap) for i in range(n) if f"user{i}" not in wanted)
+        for name in probes:
+            users.add(name, "pw" + name[4:])
+        print(f"built {n:,} users in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(txt) / 1e6:.0f} MB txt)")
+
+        t_scan = median_ms(lambda u: scan_login(txt, u, "pw" + u[4:]), probes[:5])
+        t_lookup = median_ms(users._hash, probes)
+        t_login = median_ms(lambda u: users.authenticate(u, "pw" + u[4:]), probes)
+        t_miss = median_ms(lambda u: users.authenticate(u + "x", "nope"), probes)
+        users.close()
+
+    print(f"{'path':>22}  {'median':>10}")
+    print(f"{'users.txt scan':>22}  {t_scan:8.3f}ms")
+    print(f"{'users.db lookup':>22}  {t_lookup:8.3f}ms")
+    print(f"{'login (kdf ' + str(args.iterations) + ')':>22}  {t_login:8.3f}ms")
+    print(f"{'unknown user':>22}  {t_miss:8.3f}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        txt = os.path.join(tmp, "users.txt")
+        with open(txt, "w") as f:
+            f.writelines(f"user{i},pw{i}\n" for i in range(args.import_users))
+        users = task_manager.UserStore(os.path.join(tmp, "users.db"))
+        start = time.perf_counter()
+        users.import_legacy(txt)
+        per_user = (time.perf_counter() - start) / max(args.import_users, 1)
+        users.close()
+    print(f"\nimport_legacy: {per_user * 1000:.1f}ms per user, so {n:,} users would take "
+          f"{per_user * n / 3600:.1f}h (resumable, {task_manager.IMPORT_CHUNK} per commit)")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            start = time.perf_counter()
+            for i in range(args.tasks):
+                task_manager.append_task("single", f"task {i}")
+            t_single = time.perf_counter() - start
+            start = time.perf_counter()
+            with task_manager.TaskSession("batch") as session:
+                for i in range(args.tasks):
+                    session.add(f"task {i}")
+            t_batch = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    print(f"\nprovision {args.tasks:,} tasks: one call each {t_single:.2f}s, "
+          f"one TaskSession {t_batch:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark todo.py task loading and `list` on large task files.
+
+    python benchmarks/bench_todo.py [--tasks 100000 1000000]
+
+For each size it writes the same synthetic tasks in both snapshot formats
+and compares:
+  dicts    the original model: a JSON list of task dicts, filtered with
+           string dates re-parsed by strptime for every overdue check
+  columns  store.TaskStore: columnar snapshot, id-sorted array columns,
+           Task objects built only for the rows that are listed
+
+"mem/task" is the memory held after loading (tracemalloc), "load" the time
+to open the file, and "list" / "overdue" the time for the default list and
+`list --overdue` (rows are formatted but not printed). A second table times
+one 20-row page (`--limit 20`) of the columnar store in each sort order.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "python_todo_app"))
+import store  # noqa: E402
+import todo  # noqa: E402
+
+
+def make_tasks(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    base = date.today().toordinal() - 400
+    for i in range(1, n + 1):
+        due = base + rnd.randint(0, 800) if rnd.random() < 0.5 else None
+        yield store.Task(i, f"Task {i}: follow up on item {rnd.randint(1, 10 ** 6)}",
+                         rnd.random() < 0.7, "2024-05-01T10:00:00", due, rnd.randint(1, 3))
+
+
+# -- the original dict-based path, as todo.py had it ------------------------
+
+def dict_is_overdue(task) -> bool:
+    if not task.get("due"):
+        return False
+    due = datetime.strptime(task["due"], "%Y-%m-%d").date()
+    return (not task["done"]) and (due < date.today())
+
+
+def dict_fmt_row(t) -> str:
+    due = t.get("due") or "-"
+    over = "!" if dict_is_overdue(t) else " "
+    status = "✓" if t["done"] else " "
+    return f'{t["id"]:>3}  [{status}]  P{todo.prio_str(t["priority"])}  {due:>10}  {over}  {t["title"]}'
+
+
+def dict_load(path):
+    with open(path, encoding="utf-8") as f:
+        return {t["id"]: t for t in json.load(f)}
+
+
+def dict_list(tasks, overdue: bool):
+    return [dict_fmt_row(t) for t in tasks.values()
+            if not t["done"] and (not overdue or dict_is_overdue(t))]
+
+
+# -- the columnar store -----------------------------------------------------
+
+def columns_list(s, overdue: bool):
+    today = todo.today_ordinal()
+    return [todo.fmt_row(t, today)
+            for t in s.query(overdue_before=today if overdue else None)]
+
+
+def columns_page(s, sort: str, overdue: bool):
+    today = todo.today_ordinal()
+    return [todo.fmt_row(t, today)
+            for t in s.query(overdue_before=today if overdue else None, sort=sort, limit=20)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def measure(load, listing):
+    tracemalloc.start()
+    obj = load()
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    t_load, obj = timed(load)
+    t_list, rows = timed(lambda: listing(obj, False))
+    t_over, over = timed(lambda: listing(obj, True))
+    return mem, t_load, t_list, t_over, len(rows), len(over)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--tasks", type=int, nargs="+", default=[100000, 1000000])
+    args = p.parse_args()
+
+    print(f"{'tasks':>9}  {'model':>7}  {'mem/task':>9}  {'load':>9}  {'list':>9}  {'overdue':>9}")
+    pages = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.tasks:
+            legacy = os.path.join(tmp, f"legacy-{n}.json")
+            with open(legacy, "w", encoding="utf-8") as f:
+                json.dump([t.to_dict() for t in make_tasks(n)], f, indent=2)
+            columnar = os.path.join(tmp, f"columns-{n}.json")
+            s = store.TaskStore(columnar)
+            s.add_many(make_tasks(n))
+
+            results = {
+                "dicts": measure(lambda: dict_load(legacy), dict_list),
+                "columns": measure(lambda: store.TaskStore(columnar), columns_list),
+            }
+            assert results["dicts"][4:] == results["columns"][4:]
+            for model, (mem, t_load, t_list, t_over, _, _) in results.items():
+                print(f"{n:>9}  {model:>7}  {mem / n:7.0f} B  {t_load:8.2f}s"
+                      f"  {t_list:8.2f}s  {t_over:8.2f}s")
+            pages.append((n, s))
+
+        print(f"\n{'tasks':>9}  {'page of 20':>25}  {'time':>9}")
+        for n, s in pages:
+            for sort in store.SORT_ORDERS:
+                for overdue in (False, True):
+                    label = f"--sort {sort}" + (" --overdue" if overdue else "")
+                    t_page, _ = timed(lambda: columns_page(s, sort, overdue))
+                    print(f"{n:>9}  {label:>25}  {t_page * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness: time every app's hot paths and check for regressions.
+
+    python benchmarks/run.py [--sizes 1e3 1e4 1e5] [--suites todo tasks expenses eval]
+                             [--output benchmark-results.json] [--baseline FILE]
+                             [--threshold 0.5] [--profile 'todo.list/*']
+
+For each size n it builds a synthetic dataset per suite in a temporary
+directory and times:
+  todo      load (open a TaskStore of n tasks), save (compact to a snapshot),
+            list (all pending tasks, formatted), list_page (`--sort due
+            --limit 20`)
+  tasks     task_manager: login (UserStore.authenticate among n users, at
+            --kdf-iterations), lookup (the indexed hash fetch alone),
+            read_tasks (a task file of n tasks)
+  expenses  expense_tracker: load / save (snapshot of n expenses), index
+            (DateIndex build), budget_status (view_budget_status, 10
+            budgets), range_sum (a year through the index)
+  eval      safe_eval: evaluate (cold cache, an n-term expression),
+            evaluate_cached, evaluate_batch (a formula over n rows)
+
+Fast operations are looped until a run takes ~10 ms (like timeit), and
+each case keeps the best and median of --repeat runs, in seconds per call.
+Results go to --output as JSON ({"meta": {...}, "results": {"todo.load/1000":
+{"best", "median", "number"}}}). With --baseline, each case is compared
+with the same case in an earlier results file and flagged as a regression
+when its best time grew by more than --threshold (and by more than
+--noise seconds); the exit status is then 1. Save a run with --output as
+the baseline for later runs on the same machine.
+
+--profile runs the cases matching a pattern once more under cProfile and
+prints the top functions by cumulative time.
+"""
+import argparse
+import cProfile
+import fnmatch
+import io
+import json
+import os
+import platform
+import pstats
+import statistics
+import sys
+import tempfile
+import time
+from array import array
+from contextlib import contextmanager, redirect_stdout
+from datetime import date, datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+import bench_expense_index  # noqa: E402
+import bench_safe_eval  # noqa: E402  (adds python_calculator_app to sys.path)
+import bench_todo  # noqa: E402  (adds python_todo_app to sys.path)
+import expense_store  # noqa: E402
+import expense_tracker  # noqa: E402
+import safe_eval  # noqa: E402
+import store  # noqa: E402
+import task_manager  # noqa: E402
+import todo  # noqa: E402
+
+SUITES = {}
+MIN_RUN = 0.01  # seconds; faster calls are looped
+
+
+def suite(name):
+    def register(fn):
+        SUITES[name] = fn
+        return fn
+    return register
+
+
+@contextmanager
+def _in_dir(path):
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+@suite("todo")
+def todo_suite(n, tmp, args):
+    path = os.path.join(tmp, "tasks.json")
+    s = store.TaskStore(path)
+    s.add_many(bench_todo.make_tasks(n))
+    today = todo.today_ordinal()
+    return {
+        "load": lambda: store.TaskStore(path),
+        "save": s.compact,
+        "list": lambda: [todo.fmt_row(t, today) for t in s.query()],
+        "list_page": lambda: [todo.fmt_row(t, today) for t in s.query(sort="due", limit=20)],
+    }
+
+
+@suite("tasks")
+def tasks_suite(n, tmp, args):
+    task_manager.KDF_ITERATIONS = args.kdf_iterations
+    users = task_manager.UserStore(os.path.join(tmp, "users.db"))
+    cheap = task_manager.hash_password("bulk", iterations=1)
+    users.add_hashed((f"user{i}", cheap) for i in range(n - 1))
+    users.add("probe", "secret")
+    with _in_dir(tmp), task_manager.TaskSession("probe") as session:
+        for i in range(n):
+            session.add(f"task {i}")
+
+    def read_tasks():
+        with _in_dir(tmp):
+            return task_manager.read_tasks("probe")
+
+    return {
+        "login": lambda: users.authenticate("probe", "secret"),
+        "lookup": lambda: users._hash("probe"),
+        "read_tasks": read_tasks,
+    }
+
+
+@suite("expenses")
+def expenses_suite(n, tmp, args):
+    s = bench_expense_index.make_store(n, 50)
+    budget = {f"Category {i}": 1000.0 for i in range(10)}
+    path = os.path.join(tmp, "expenses.snapshot")
+    expense_store.write_snapshot(path, s, budget)
+    s.index  # built once, on the first budget view
+    start, end = date(2022, 1, 1).toordinal(), date(2022, 12, 31).toordinal()
+
+    def budget_status():
+        expense_tracker.expenses, expense_tracker.budget = s, budget
+        with redirect_stdout(io.StringIO()):
+            expense_tracker.view_budget_status()
+
+    return {
+        "load": lambda: expense_store.read_snapshot(path),
+        "save": lambda: expense_store.write_snapshot(path, s, budget),
+        "index": lambda: expense_store.DateIndex(s),
+        "budget_status": budget_status,
+        "range_sum": lambda: s.index.spent_between(start, end, "Category 3"),
+    }
+
+
+@suite("eval")
+def eval_suite(n, tmp, args):
+    expr = bench_safe_eval.make_expr(n)
+    limits = safe_eval.Limits(max_nodes=max(2 * n, safe_eval.DEFAULT_LIMITS.max_nodes))
+    column = array("d", range(n))
+
+    def cold():
+        safe_eval.cache_clear()
+        return safe_eval.evaluate(expr, limits)
+
+    return {
+        "evaluate": cold,
+        "evaluate_cached": lambda: safe_eval.evaluate(expr, limits),
+        "evaluate_batch": lambda: safe_eval.evaluate_batch("x * 1.07 + 2", x=column),
+    }
+
+
+def measure(fn, repeat):
+    """Best and median seconds per call over repeat runs."""
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    number = 1 if first >= MIN_RUN else min(int(MIN_RUN / max(first, 1e-7)) + 1, 100000)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {"best": min(times), "median": statistics.median(times), "number": number}
+
+
+def fmt_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f}ms"
+    return f"{seconds:8.3f}s "
+
+
+def profile(fn, key, top):
+    prof = cProfile.Profile()
+    prof.runcall(fn)
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(top)
+    print(f"\n--- profile: {key} ---\n{out.getvalue()}", file=sys.stderr)
+
+
+def compare(results, baseline, threshold, noise):
+    """Print the comparison table; returns the regressed case names."""
+    regressions = []
+    print(f"\n{'case':<34}  {'baseline':>10}  {'current':>10}  {'change':>8}")
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        change = cur["best"] / base["best"] - 1 if base["best"] else 0.0
+        flag = ""
+        if change > threshold and cur["best"] - base["best"] > noise:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{key:<34}  {fmt_time(base['best'])}  {fmt_time(cur['best'])}  "
+              f"{change:+7.0%}{flag}")
+    missing = sorted(set(baseline) - set(results))
+    if missing:
+        print(f"({len(missing)} baseline case(s) not run)")
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--sizes", type=lambda s: int(float(s)), nargs="+",
+                   default=[1000, 10000, 100000], help="Dataset sizes (1e3 .. 1e7)")
+    p.add_argument("--suites", nargs="+", choices=list(SUITES), default=list(SUITES))
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--kdf-iterations", type=int, default=1000,
+                   help="PBKDF2 iterations for the login case (default 1000)")
+    p.add_argument("--output", default="benchmark-results.json")
+    p.add_argument("--baseline", help="Earlier results file to compare against")
+    p.add_argument("--threshold", type=float, default=0.5,
+                   help="Flag cases more than this fraction slower (default 0.5)")
+    p.add_argument("--noise", type=float, default=50e-6,
+                   help="Ignore slowdowns smaller than this many seconds (default 50e-6)")
+    p.add_argument("--profile", metavar="PATTERN", help="Profile matching cases, e.g. 'todo.*'")
+    p.add_argument("--profile-top", type=int, default=15)
+    args = p.parse_args()
+
+    meta = {"created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "numpy": expense_store.np is not None,
+            "sizes": args.sizes, "repeat": args.repeat, "kdf_iterations": args.kdf_iterations}
+    results = {}
+    print(f"{'case':<34}  {'best':>10}  {'median':>10}  {'setup':>8}")
+    for name in args.suites:
+        for n in args.sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                ops = SUITES[name](n, tmp, args)
+                setup = time.perf_counter() - start
+                for op, fn in ops.items():
+                    key = f"{name}.{op}/{n}"
+                    results[key] = r = measure(fn, args.repeat)
+                    print(f"{key:<34}  {fmt_time(r['best'])}  {fmt_time(r['median'])}"
+                          f"  {setup:7.1f}s", flush=True)
+                    if args.profile and fnmatch.fnmatch(key, args.profile):
+                        profile(fn, key, args.profile_top)
+                del ops
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nwrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for field in ("python", "platform", "numpy", "kdf_iterations"):
+            if baseline["meta"].get(field) != meta[field]:
+                print(f"warning: baseline {field} was {baseline['meta'].get(field)!r}, "
+                      f"now {meta[field]!r}", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.threshold, args.noise)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
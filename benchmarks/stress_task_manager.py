@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Stress test concurrent task_manager.py sessions.
+
+    python benchmarks/stress_task_manager.py [--sessions 200] [--users 10] [--ops 20]
+
+Runs --sessions simulated sessions at once (threads spread over --processes
+processes) against --users users, so many sessions share each user's task
+file. Every session adds --ops uniquely named tasks, marks about half of
+them completed and deletes about --delete-rate of them, then the final
+files are checked:
+  naive    the original text file, read-modify-write with no locking
+  locked   task_manager's record files: append_task, then read_tasks +
+           set_status (in-place status byte) or remove_task (tombstone),
+           retrying on Conflict. Deletes renumber the tasks, so a change
+           by number made against a list read before another session's
+           delete is refused; "conflicts" counts those retries.
+
+A lost update is an added task that is missing at the end, a completed
+(and not later deleted) one that isn't marked completed, or a deleted one
+that is still there;
+corrupt lines are torn "task,status" lines.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import task_manager  # noqa: E402
+
+
+def naive_session(user, name, ops, rnd, delete_rate):
+    path = task_manager.get_legacy_task_file(user)
+    added, completed, deleted, conflicts = [], [], [], 0
+    live = []
+    for k in range(ops):
+        task = f"{name}-{k}"
+        with open(path, "a") as f:
+            f.write(f"{task},not completed\n")
+        added.append(task)
+        live.append(task)
+        delete = rnd.random() < delete_rate
+        if delete or rnd.random() < 0.5:
+            target = rnd.choice(live)
+            with open(path, "r") as f:
+                tasks = f.readlines()
+            time.sleep(0)  # a user reading the list before typing a number
+            if delete:
+                tasks = [line for line in tasks if not line.startswith(target + ",")]
+            for i, line in enumerate(tasks):
+                if line.startswith(target + ","):
+                    tasks[i] = f"{target},completed\n"
+            with open(path, "w") as f:
+                f.writelines(tasks)
+            if delete:
+                live.remove(target)
+                deleted.append(target)
+            else:
+                completed.append(target)
+    return added, completed, deleted, conflicts
+
+
+def locked_session(user, name, ops, rnd, delete_rate):
+    added, completed, deleted, conflicts = [], [], [], 0
+    live = []
+    for k in range(ops):
+        task = f"{name}-{k}"
+        task_manager.append_task(user, task)
+        added.append(task)
+        live.append(task)
+        delete = rnd.random() < delete_rate
+        if delete or rnd.random() < 0.5:
+            target = rnd.choice(live)
+            while True:
+                version, tasks = task_manager.read_tasks(user)
+                time.sleep(0)
+                number = 1 + next(i for i, (task, _) in enumerate(tasks) if task == target)
+                try:
+                    if delete:
+                        task_manager.remove_task(user, version, number)
+                    else:
+                        task_manager.set_status(user, version, number)
+                    break
+                except task_manager.Conflict:
+                    conflicts += 1
+            if delete:
+                live.remove(target)
+                deleted.append(target)
+            else:
+                completed.append(target)
+    return added, completed, deleted, conflicts
+
+
+SESSIONS = {"naive": naive_session, "locked": locked_session}
+
+
+def run_worker(mode, workdir, sessions, users, ops, delete_rate, seed):
+    """Run several sessions as threads; returns their (added, completed, deleted, conflicts)."""
+    os.chdir(workdir)
+    results = [None] * len(sessions)
+
+    def run(slot, s):
+        rnd = random.Random(seed + s)
+        results[slot] = SESSIONS[mode](f"user{s % users}", f"s{s}", ops, rnd, delete_rate)
+
+    threads = [threading.Thread(target=run, args=(slot, s)) for slot, s in enumerate(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def lost_updates(mode, workdir, users, results):
+    final, corrupt = {}, 0
+    for u in range(users):
+        if mode == "locked":
+            final.update(task_manager.read_tasks(f"user{u}")[1])
+            continue
+        path = os.path.join(workdir, task_manager.get_legacy_task_file(f"user{u}"))
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    task, sep, status = line.strip().rpartition(",")
+                    if not sep or status not in ("completed", "not completed"):
+                        corrupt += 1
+                    final[task] = status
+    lost = 0
+    for added, completed, deleted, _ in results:
+        gone = set(deleted)
+        lost += sum(1 for t in added if t not in final and t not in gone)
+        lost += sum(1 for t in completed if t not in gone and final.get(t) != "completed")
+        lost += sum(1 for t in deleted if t in final)
+    return lost, corrupt
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--sessions", type=int, default=200)
+    p.add_argument("--users", type=int, default=10)
+    p.add_argument("--ops", type=int, default=20, help="Tasks added per session")
+    p.add_argument("--delete-rate", type=float, default=0.2,
+                   help="Chance that a session deletes one of its tasks after an add")
+    p.add_argument("--processes", type=int, default=4)
+    p.add_argument("--mode", choices=["naive", "locked", "both"], default="both")
+    args = p.parse_args()
+
+    cwd = os.getcwd()
+    modes = ["naive", "locked"] if args.mode == "both" else [args.mode]
+    print(f"{args.sessions} sessions, {args.users} users, {args.ops} adds each, "
+          f"delete rate {args.delete_rate}")
+    print(f"{'mode':>7}  {'ops/s':>9}  {'conflicts':>9}  {'lost updates':>12}  {'corrupt':>7}")
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as workdir:
+            groups = [list(range(i, args.sessions, args.processes))
+                      for i in range(args.processes)]
+            start = time.perf_counter()
+            with ProcessPoolExecutor(args.processes) as pool:
+                futures = [pool.submit(run_worker, mode, workdir, g, args.users, args.ops,
+                                       args.delete_rate, 1)
+                           for g in groups if g]
+                results = [r for f in futures for r in f.result()]
+            elapsed = time.perf_counter() - start
+            ops = sum(len(a) + len(c) + len(d) for a, c, d, _ in results)
+            conflicts = sum(c for _, _, _, c in results)
+            os.chdir(workdir)
+            lost, corrupt = lost_updates(mode, workdir, args.users, results)
+            os.chdir(cwd)
+            print(f"{mode:>7}  {ops / elapsed:9,.0f}  {conflicts:9}  {lost:12}  {corrupt:7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Crash-safe file writes shared by the CLI apps in this repo.
+
+atomic_write() never leaves a half-written file behind: data goes to a
+temporary file in the same directory, is fsync'd, and then renamed over the
+target in one step. open_atomic() does the same for data written as a
+stream. append_lines() appends and fsyncs.
+
+Inside `with group_commit():` writes are deferred instead: the last version
+of each file, removals and all appended lines are kept in memory and flushed
+once when the outermost block exits, so a bulk edit pays for one rewrite and
+one fsync per file instead of one per mutation. Until then the files on disk
+stay exactly as they were before the block.
+
+    with durable.group_commit():
+        for row in rows:
+            store.add(row)      # each add would normally hit the disk
+"""
+import json
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Set, Union
+
+_lock = threading.RLock()
+_depth = 0
+_pending_writes: Dict[str, bytes] = {}
+_pending_appends: Dict[str, List[str]] = {}
+_pending_removes: Set[str] = set()
+
+def _fsync_dir(path: str) -> None:
+    """Make a rename durable; not supported (or needed) on Windows."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _file_mode(path: str) -> int:
+    """Mode the file would get from a plain open(path, "w")."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+@contextmanager
+def open_atomic(path: str) -> Iterator[BinaryIO]:
+    """
+    Yield a binary file that replaces path when the block exits cleanly
+    (and is discarded if it raises). Not deferred by group_commit().
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = _file_mode(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".",
+                               suffix=".tmp")
+    try:
+        os.chmod(tmp, mode)  # mkstemp creates 0600
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(path)
+
+def _write_now(path: str, data: bytes) -> None:
+    with open_atomic(path) as f:
+        f.write(data)
+
+def _append_now(path: str, lines: Iterable[str]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+def atomic_write(path: str, data: Union[str, bytes]) -> None:
+    """Replace the contents of path all at once (deferred inside group_commit)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with _lock:
+        if _depth:
+            _pending_writes[path] = data
+            _pending_removes.discard(path)
+            return
+    _write_now(path, data)
+
+def write_json(path: str, obj: Any, **dump_kwargs) -> None:
+    """atomic_write() of obj serialized as JSON."""
+    atomic_write(path, json.dumps(obj, **dump_kwargs))
+
+def append_lines(path: str, lines: Iterable[str]) -> None:
+    """Append lines (with their newlines) to path and fsync."""
+    with _lock:
+        if _depth:
+            _pending_appends.setdefault(path, []).extend(lines)
+            return
+    _append_now(path, lines)
+
+def remove(path: str) -> None:
+    """Delete path (deferred inside group_commit), dropping anything pending for it."""
+    with _lock:
+        _pending_writes.pop(path, None)
+        _pending_appends.pop(path, None)
+        if _depth:
+            # Not before the flush: a compaction's snapshot is still pending,
+            # and dropping its log now would lose everything since the last one
+            _pending_removes.add(path)
+            return
+    if os.path.exists(path):
+        os.remove(path)
+
+def flush() -> None:
+    """
+    Write out everything deferred so far: rewrites first, then removals,
+    then appends, so a log is only dropped once the snapshot replacing it
+    is on disk, and lines appended after that start the new log.
+    """
+    with _lock:
+        writes = list(_pending_writes.items())
+        removes = list(_pending_removes)
+        appends = list(_pending_appends.items())
+        _pending_writes.clear()
+        _pending_removes.clear()
+        _pending_appends.clear()
+    for path, data in writes:
+        _write_now(path, data)
+    for path in removes:
+        if os.path.exists(path):
+            os.remove(path)
+    for path, lines in appends:
+        _append_now(path, lines)
+
+@contextmanager
+def group_commit():
+    """Defer writes until the outermost group_commit() block exits."""
+    global _depth
+    with _lock:
+        _depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            outermost = _depth == 0
+        if outermost:
+            flush()
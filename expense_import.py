@@ -0,0 +1,164 @@
+"""
+Bulk CSV import for expense_tracker.py.
+
+    python expense_tracker.py import statements/*.csv [--category Uncategorized]
+
+Each file needs a header row. Columns are matched case-insensitively
+against COLUMNS ("Date" or "Posted Date", "Amount" or "Debit",
+"Description", "Memo" or "Payee", "Category"); only date and amount are
+required, and rows without a category get the default one. Dates may be
+MM-DD-YYYY, MM/DD/YYYY, MM-DD-YY, MM/DD/YY or YYYY-MM-DD. A statement
+repeats the same few hundred dates, so parse_any_date() is cached and each
+distinct date string is parsed once. Amounts may carry "$" and thousands
+separators, and "(12.50)" means -12.50.
+
+A row is a duplicate if an existing expense has the same date, category,
+amount (to the cent) and description. Matching counts occurrences within
+a file, so re-importing a statement adds nothing, while two identical
+coffees on one day in a new statement both go in. Each file is checked
+against the store plus the rows added by earlier files of the same
+import, so `import jan.csv jan_copy.csv` adds January once, and running it
+again adds nothing. Existing expenses are looked up through the store's
+date index, one day at a time, only for days that appear in the import.
+
+Reading never touches the store: rows collect in Importer.pending until
+commit() appends them all at once, for the caller to persist as one batch.
+A file joins pending only once it has been read to the end, so a file that
+fails part way (a bad header, undecodable bytes) adds nothing.
+"""
+import csv
+import math
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from expense_store import ExpenseStore
+
+DEFAULT_CATEGORY = "Uncategorized"
+DATE_FORMATS = ("%m-%d-%Y", "%m/%d/%Y", "%Y-%m-%d", "%m-%d-%y", "%m/%d/%y")
+COLUMNS = {
+    "date": ("date", "transaction date", "posted date", "posting date"),
+    "amount": ("amount", "debit", "withdrawal"),
+    "description": ("description", "memo", "payee", "details"),
+    "category": ("category",),
+}
+
+
+class FileResult(NamedTuple):
+    path: str
+    added: int
+    duplicates: int
+    errors: List[Tuple[int, str]]  # (line number, message)
+
+
+@lru_cache(maxsize=65536)
+def parse_any_date(text: str) -> int:
+    """A date in any of DATE_FORMATS -> day ordinal."""
+    text = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).toordinal()
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date {text!r}")
+
+
+def parse_amount(text: str) -> float:
+    try:
+        amount = float(text)  # the usual case: a plain number
+    except ValueError:
+        text = text.strip().replace("$", "").replace(",", "")
+        if text.startswith("(") and text.endswith(")"):
+            amount = -float(text[1:-1])
+        else:
+            amount = float(text)
+    if not math.isfinite(amount):  # float() accepts "nan" and "inf"
+        raise ValueError(f"amount {text!r} is not a finite number")
+    return amount
+
+
+def _key(category: str, amount: float, description: str) -> Tuple[str, int, str]:
+    return category, round(amount * 100), description
+
+
+def _columns(header: List[str]) -> Dict[str, int]:
+    names = [h.strip().lower() for h in header]
+    found = {}
+    for field, aliases in COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                found[field] = names.index(alias)
+                break
+    missing = [f for f in ("date", "amount") if f not in found]
+    if missing:
+        raise ValueError(f"no {' or '.join(missing)} column in header {header!r}")
+    return found
+
+
+class Importer:
+    """Reads CSV files into pending rows, skipping expenses already in the store."""
+
+    def __init__(self, store: ExpenseStore, default_category: str = DEFAULT_CATEGORY):
+        self.store = store
+        self.default_category = default_category
+        self.pending = ExpenseStore()
+        # day -> keys of the expenses on it, in the store or added by earlier files
+        self._known: Dict[int, Counter] = {}
+
+    def _known_on(self, day: int) -> Counter:
+        known = self._known.get(day)
+        if known is None:
+            s = self.store
+            known = self._known[day] = Counter(
+                _key(s.categories[s.cats[row]], s.amounts[row], s.descriptions[row])
+                for row in s.index.rows_between(day, day))
+        return known
+
+    def read(self, path: str) -> FileResult:
+        """
+        Read one file into pending; bad rows are counted, while a bad header
+        or an unreadable file raises (ValueError, OSError) and adds nothing.
+        """
+        rows_read, added, duplicates, errors = ExpenseStore(), [], 0, []
+        matched: Counter = Counter()  # (day, key) -> known expenses this file matched
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = csv.reader(f)
+            header = next(rows, None)
+            if header is None:
+                return FileResult(path, 0, 0, [])
+            cols = _columns(header)
+            di, ai = cols["date"], cols["amount"]
+            ci, ti = cols.get("category"), cols.get("description")
+            for line, row in enumerate(rows, 2):
+                if not any(row):
+                    continue
+                try:
+                    day = parse_any_date(row[di])
+                    amount = parse_amount(row[ai])
+                    category = (row[ci].strip() if ci is not None else "") or self.default_category
+                    description = row[ti].strip() if ti is not None else ""
+                except (ValueError, IndexError) as e:
+                    errors.append((line, str(e) or "missing column"))
+                    continue
+                key = _key(category, amount, description)
+                if matched[day, key] < self._known_on(day)[key]:
+                    matched[day, key] += 1
+                    duplicates += 1
+                    continue
+                rows_read.append(day, category, amount, description)
+                added.append((day, key))
+        self.pending.append_store(rows_read)
+        # Later files in the same import are checked against this one too
+        for day, key in added:
+            self._known[day][key] += 1
+        return FileResult(path, len(added), duplicates, errors)
+
+    def commit(self) -> Optional[ExpenseStore]:
+        """Append every pending row to the store; returns them (None if there were none)."""
+        if not len(self.pending):
+            return None
+        rows, self.pending = self.pending, ExpenseStore()
+        self.store.append_store(rows)
+        self._known.clear()  # rebuilt from the store's index on the next read
+        return rows
@@ -0,0 +1,230 @@
+"""
+Cross-user budget report over many expense_tracker.py data sets.
+
+    python expense_report.py USERS_DIR... [--month YYYY-MM] [--workers N]
+                             [--timings shards.csv] [--json]
+
+Each shard is one user's data: a directory holding expenses.snapshot /
+expenses.jsonl (or a legacy expenses.json), or a legacy .json file given
+directly; directories without any of those are searched recursively.
+
+For every shard a worker process computes what view_budget_status shows
+(spending per category in --month, default the current one, and the
+budgets set), then the parent merges the partial totals: per category the
+total spent, total budgeted, how many users budget it and how many are
+over. Workers return only these small dicts, and at most IN_FLIGHT shards
+per worker are queued at once, so memory stays at about one loaded shard
+per worker however many users there are.
+
+Progress goes to stderr every --progress shards. Per-shard timing (rows,
+seconds, worker pid) is written to --timings as CSV, and the summary ends
+with the median/p95/max shard time and the slowest shards.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import expense_store
+from expense_tracker import JOURNAL_FILE, LEGACY_FILE, SNAPSHOT_FILE
+
+IN_FLIGHT = 2  # queued shards per worker
+
+
+class ShardResult(NamedTuple):
+    path: str
+    rows: int
+    spent: Dict[str, float]
+    budget: Dict[str, float]
+    seconds: float
+    pid: int
+    error: Optional[str] = None
+
+
+def find_shards(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+        elif any(os.path.exists(os.path.join(path, name))
+                 for name in (SNAPSHOT_FILE, JOURNAL_FILE, LEGACY_FILE)):
+            yield path
+        elif os.path.isdir(path):
+            with os.scandir(path) as entries:
+                subdirs = sorted(e.path for e in entries if e.is_dir())
+            yield from find_shards(subdirs)
+
+
+def month_bounds(month: str) -> Tuple[int, int]:
+    """'YYYY-MM' -> first and last day ordinals."""
+    first = datetime.strptime(month, "%Y-%m").date()
+    after = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return first.toordinal(), after.toordinal() - 1
+
+
+def _legacy_totals(path: str, month: str) -> Tuple[int, Dict[str, float], Dict[str, float]]:
+    with open(path, "r") as f:
+        data = json.load(f)
+    spent = {}
+    expenses = data.get("expenses", [])
+    for exp in expenses:
+        d = exp["date"]  # MM-DD-YYYY
+        if f"{d[6:]}-{d[:2]}" == month:
+            spent[exp["category"]] = spent.get(exp["category"], 0) + exp["amount"]
+    return len(expenses), spent, data.get("budget", {})
+
+
+def aggregate_shard(path: str, month: str) -> ShardResult:
+    """One user's spending per category in month, and their budgets."""
+    start = time.perf_counter()
+    try:
+        if os.path.isfile(path):
+            rows, spent, budget = _legacy_totals(path, month)
+        else:
+            snapshot = os.path.join(path, SNAPSHOT_FILE)
+            journal = os.path.join(path, JOURNAL_FILE)
+            if os.path.exists(snapshot) or os.path.exists(journal):
+                store, budget = expense_store.ExpenseStore(), {}
+                if os.path.exists(snapshot):
+                    store, budget = expense_store.read_snapshot(snapshot)
+                if os.path.exists(journal):
+                    expense_store.replay_journal(journal, store, budget)
+                rows, spent = len(store), store.totals_by_category(*month_bounds(month))
+            else:
+                rows, spent, budget = _legacy_totals(os.path.join(path, LEGACY_FILE), month)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return ShardResult(path, 0, {}, {}, time.perf_counter() - start, os.getpid(),
+                           f"{type(e).__name__}: {e}")
+    return ShardResult(path, rows, spent, budget, time.perf_counter() - start, os.getpid())
+
+
+def map_shards(shards: List[str], month: str, workers: int) -> Iterator[ShardResult]:
+    """aggregate_shard over every shard, yielding results as they finish."""
+    if workers <= 1:
+        for path in shards:
+            yield aggregate_shard(path, month)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        for path in shards:
+            if len(pending) >= workers * IN_FLIGHT:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(pool.submit(aggregate_shard, path, month))
+        for future in wait(pending).done:
+            yield future.result()
+
+
+class Report:
+    """Merged totals across shards."""
+
+    def __init__(self):
+        self.users = 0
+        self.rows = 0
+        self.spent: Dict[str, float] = {}
+        self.budget: Dict[str, float] = {}
+        self.budgeted: Dict[str, int] = {}  # users with a budget for the category
+        self.over: Dict[str, int] = {}  # ... who spent more than it
+
+    def merge(self, r: ShardResult) -> None:
+        self.users += 1
+        self.rows += r.rows
+        for cat, amount in r.spent.items():
+            self.spent[cat] = self.spent.get(cat, 0) + amount
+        for cat, limit in r.budget.items():
+            self.budget[cat] = self.budget.get(cat, 0) + limit
+            self.budgeted[cat] = self.budgeted.get(cat, 0) + 1
+            if r.spent.get(cat, 0) > limit:
+                self.over[cat] = self.over.get(cat, 0) + 1
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"users": self.users, "expenses": self.rows,
+                "categories": {cat: {"spent": self.spent.get(cat, 0),
+                                     "budget": self.budget.get(cat, 0),
+                                     "budgeted_users": self.budgeted.get(cat, 0),
+                                     "over_budget_users": self.over.get(cat, 0)}
+                               for cat in sorted(set(self.spent) | set(self.budget))}}
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Cross-user budget report over expense data sets")
+    p.add_argument("paths", nargs="+", help="User data directories, legacy .json files, "
+                                            "or directories of them")
+    p.add_argument("--month", default=datetime.now().strftime("%Y-%m"),
+                   help="Month to report, YYYY-MM (default: this month)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="Worker processes (default: one per core; 1 = no pool)")
+    p.add_argument("--progress", type=int, default=100, metavar="N",
+                   help="Report progress every N shards (0 = off, default 100)")
+    p.add_argument("--timings", metavar="CSV", help="Write per-shard timing to this file")
+    p.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = p.parse_args(argv)
+    month_bounds(args.month)  # validate before starting any workers
+
+    shards = list(find_shards(args.paths))
+    report = Report()
+    times, errors = [], []
+    timings = open(args.timings, "w", newline="") if args.timings else None
+    writer = csv.writer(timings) if timings else None
+    if writer:
+        writer.writerow(["shard", "rows", "seconds", "pid", "error"])
+    start = time.perf_counter()
+    try:
+        for done, result in enumerate(map_shards(shards, args.month, args.workers), 1):
+            if result.error:
+                errors.append((result.path, result.error))
+            else:
+                report.merge(result)
+            times.append((result.seconds, result.path))
+            if writer:
+                writer.writerow([result.path, result.rows, f"{result.seconds:.6f}",
+                                 result.pid, result.error or ""])
+            if args.progress and (done % args.progress == 0 or done == len(shards)):
+                elapsed = time.perf_counter() - start
+                rate = done / elapsed if elapsed else 0.0
+                eta = (len(shards) - done) / rate if rate else 0.0
+                print(f"{done}/{len(shards)} shards in {elapsed:.1f}s "
+                      f"({rate:,.0f}/s, eta {eta:.0f}s)", file=sys.stderr)
+    finally:
+        if timings:
+            timings.close()
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps({"month": args.month, **report.to_dict(),
+                          "errors": dict(errors)}, indent=2))
+    else:
+        print(f"\n--- Budget Report ({args.month}, {report.users} users, "
+              f"{report.rows} expenses) ---")
+        for cat, row in report.to_dict()["categories"].items():
+            line = f"{cat}: Spent ${row['spent']:.2f}"
+            if row["budgeted_users"]:
+                line += (f" of ${row['budget']:.2f} budget "
+                         f"({row['over_budget_users']} of {row['budgeted_users']} users over)")
+            print(line)
+        for path, error in errors:
+            print(f"{path}: {error}", file=sys.stderr)
+
+    if times:
+        times.sort()
+        seconds = [t for t, _ in times]
+        print(f"\n{len(shards)} shards in {elapsed:.2f}s with {args.workers} worker(s); "
+              f"shard time median {_percentile(seconds, 0.5) * 1000:.1f}ms, "
+              f"p95 {_percentile(seconds, 0.95) * 1000:.1f}ms, max {seconds[-1] * 1000:.1f}ms",
+              file=sys.stderr)
+        for t, path in reversed(times[-3:]):
+            print(f"  slowest: {path} ({t * 1000:.1f}ms)", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Columnar expense storage for expense_tracker.py.
+
+Expenses are kept as parallel columns instead of a list of dicts:
+  amounts       array('d')   one float per expense
+  dates         array('i')   day ordinals (date.toordinal())
+  cats          array('I')   category codes, indexes into .categories
+  descriptions  list of str
+
+so a million expenses take a few dozen bytes each besides their
+descriptions. Reports (totals by category or month, top-N categories,
+date-range sums) run as NumPy bincount/mask operations over zero-copy views
+of the columns when NumPy is installed, and as plain loops over the arrays
+otherwise. Expenses still go in and come out as the dicts expense_tracker
+has always used ({"date": "MM-DD-YYYY", "category", "amount",
+"description"}).
+
+Report date bounds may be "MM-DD-YYYY" strings or day ordinals, and are
+inclusive.
+
+store.index is a DateIndex, built on first use and kept current by
+append(): rows sorted by date for bisect lookups, plus daily, monthly and
+yearly totals (overall and per category) with prefix sums over days, so
+"spent between X and Y" and month/year totals don't scan the expenses.
+append_store() (bulk imports) drops the index instead; it is rebuilt
+vectorized on the next use.
+
+Persistence is a snapshot plus a journal:
+  expenses.snapshot  one JSON header line (row count, categories, budget,
+                     byte order), the three numeric columns as raw array
+                     bytes, then the descriptions as JSON arrays of up to
+                     SNAPSHOT_CHUNK strings, one array per line
+  expenses.jsonl     changes since the snapshot, one JSON object per line:
+                       {"expense": {...}}                     an added expense
+                       {"budget": {"category": ..., "amount": ...}}
+Adding an expense appends (and fsyncs) one journal line. Loading reads the
+columns straight into arrays with array.fromfile and streams the rest line
+by line, so no whole-file document is ever parsed. write_snapshot()
+compacts: it snapshots everything and the caller drops the journal.
+"""
+import json
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import durable
+
+try:
+    import numpy as np
+except ImportError:  # reports fall back to plain loops
+    np = None
+
+DATE_FMT = "%m-%d-%Y"
+SNAPSHOT_FORMAT = "expenses-snapshot/1"
+SNAPSHOT_CHUNK = 65536
+DateLike = Union[str, int]
+
+# datetime64[D] counts days from 1970-01-01
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=65536)
+def parse_date(s: str) -> int:
+    """'MM-DD-YYYY' -> day ordinal."""
+    return datetime.strptime(s, DATE_FMT).toordinal()
+
+
+@lru_cache(maxsize=65536)
+def format_date(ordinal: int) -> str:
+    return date.fromordinal(ordinal).strftime(DATE_FMT)
+
+
+@lru_cache(maxsize=65536)
+def _month(ordinal: int) -> str:
+    d = date.fromordinal(ordinal)
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _ordinal(d: Optional[DateLike]) -> Optional[int]:
+    return parse_date(d) if isinstance(d, str) else d
+
+
+class ExpenseStore:
+    """Expenses as parallel columns plus a category dictionary."""
+
+    def __init__(self):
+        self.amounts = array("d")
+        self.dates = array("i")
+        self.cats = array("I")
+        self.descriptions: List[str] = []
+        self.categories: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._index: Optional["DateIndex"] = None
+
+    @classmethod
+    def from_dicts(cls, expenses: Iterable[Dict[str, Any]]) -> "ExpenseStore":
+        store = cls()
+        store.extend(expenses)
+        return store
+
+    # -- adding ------------------------------------------------------------
+
+    def category_code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.categories)
+            self.categories.append(name)
+        return code
+
+    def append(self, when: DateLike, category: str, amount: float,
+               description: str = "") -> None:
+        self.amounts.append(amount)
+        self.dates.append(_ordinal(when))
+        self.cats.append(self.category_code(category))
+        self.descriptions.append(description or "")  # share one empty string
+        if self._index is not None:
+            self._index.add(len(self.amounts) - 1)
+
+    def add(self, expense: Dict[str, Any]) -> None:
+        self.append(expense["date"], expense["category"], expense["amount"],
+                    expense.get("description", ""))
+
+    def extend(self, expenses: Iterable[Dict[str, Any]]) -> None:
+        for e in expenses:
+            self.add(e)
+
+    def append_store(self, other: "ExpenseStore") -> None:
+        """Append all of other's rows, copying the columns in bulk."""
+        codes = array("I", (self.category_code(c) for c in other.categories))
+        self.amounts.extend(other.amounts)
+        self.dates.extend(other.dates)
+        if np is not None and len(other):
+            cats = np.frombuffer(other.cats, dtype=np.uint32)
+            self.cats.frombytes(np.frombuffer(codes, dtype=np.uint32)[cats].tobytes())
+        else:
+            self.cats.extend(codes[c] for c in other.cats)
+        self.descriptions.extend(other.descriptions)
+        self._index = None  # rebuilt on next use: cheaper than inserting row by row
+
+    @property
+    def index(self) -> "DateIndex":
+        if self._index is None:
+            self._index = DateIndex(self)
+        return self._index
+
+    # -- reading -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return {"date": format_date(self.dates[i]), "category": self.categories[self.cats[i]],
+                "amount": self.amounts[i], "description": self.descriptions[i]}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[i] for i in range(len(self)))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    # -- reports -----------------------------------------------------------
+
+    def _views(self):
+        """Zero-copy NumPy views of the columns (don't keep them around: arrays can't grow)."""
+        return (np.frombuffer(self.amounts, dtype=np.float64),
+                np.frombuffer(self.dates, dtype=np.int32),
+                np.frombuffer(self.cats, dtype=np.uint32))
+
+    def _in_range(self, dates, start: Optional[int], end: Optional[int]):
+        mask = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            mask &= dates >= start
+        if end is not None:
+            mask &= dates <= end
+        return mask
+
+    def totals_by_category(self, start: Optional[DateLike] = None,
+                           end: Optional[DateLike] = None) -> Dict[str, float]:
+        """Total spent per category (only categories with expenses in range)."""
+        start, end = _ordinal(start), _ordinal(end)
+        n = len(self.categories)
+        if np is not None and len(self):
+            amounts, dates, cats = self._views()
+            if start is not None or end is not None:
+                mask = self._in_range(dates, start, end)
+                amounts, cats = amounts[mask], cats[mask]
+            totals = np.bincount(cats, weights=amounts, minlength=n).tolist()
+            seen = np.bincount(cats, minlength=n).tolist()
+        else:
+            totals, seen = [0.0] * n, [0] * n
+            for c, a, d in zip(self.cats, self.amounts, self.dates):
+                if (start is None or d >= start) and (end is None or d <= end):
+                    totals[c] += a
+                    seen[c] += 1
+        return {self.categories[c]: totals[c] for c in range(n) if seen[c]}
+
+    def totals_by_month(self) -> Dict[Tuple[str, str], float]:
+        """Total spent per (category, "YYYY-MM")."""
+        if np is not None and len(self):
+            amounts, dates, cats = self._views()
+            months = (dates - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+            months = months.astype(np.int64)
+            first, span = int(months.min()), int(months.max() - months.min()) + 1
+            key = cats.astype(np.int64) * span + (months - first)
+            totals = np.bincount(key, weights=amounts)
+            present = np.flatnonzero(np.bincount(key))
+            result = {}
+            for k, total in zip(present.tolist(), totals[present].tolist()):
+                cat, m = divmod(k, span)
+                year, month = divmod(first + m, 12)
+                result[(self.categories[cat], f"{1970 + year:04d}-{month + 1:02d}")] = total
+            return result
+        result: Dict[Tuple[str, str], float] = {}
+        for c, a, d in zip(self.cats, self.amounts, self.dates):
+            k = (self.categories[c], _month(d))
+            result[k] = result.get(k, 0.0) + a
+        return result
+
+    def top_categories(self, n: int, start: Optional[DateLike] = None,
+                       end: Optional[DateLike] = None) -> List[Tuple[str, float]]:
+        """The n categories with the highest totals, largest first."""
+        totals = self.totals_by_category(start, end)
+        return sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+    def range_sum(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                  category: Optional[str] = None) -> float:
+        """Total spent between start and end, optionally for one category."""
+        start, end = _ordinal(start), _ordinal(end)
+        code = None if category is None else self._codes.get(category, -1)
+        if code == -1:
+            return 0.0
+        if np is not None and len(self):
+            amounts, dates, cats = self._views()
+            mask = self._in_range(dates, start, end)
+            if code is not None:
+                mask &= cats == code
+            return float(amounts[mask].sum())
+        return sum((a for a, d, c in zip(self.amounts, self.dates, self.cats)
+                   if (start is None or d >= start) and (end is None or d <= end)
+                   and (code is None or c == code)), 0.0)
+
+
+class DateIndex:
+    """
+    Date-ordered view and rollups of an ExpenseStore.
+
+    Rows are kept sorted by date (sorted_dates / sorted_rows) and totals are
+    kept per (category code, day), month and year; a category of None means
+    all categories. Range sums bisect a prefix-sum array over the distinct
+    days, so they cost O(log days) however many expenses there are.
+    """
+
+    def __init__(self, store: ExpenseStore):
+        self.store = store
+        self._day: Dict[Optional[int], Dict[int, float]] = {None: {}}
+        self._month: Dict[Tuple[Optional[int], int, int], float] = {}
+        self._year: Dict[Tuple[Optional[int], int], float] = {}
+        self._prefix: Dict[Optional[int], Tuple[List[int], List[float]]] = {}
+        if np is not None and len(store):
+            amounts, dates, cats = store._views()
+            order = np.argsort(dates, kind="stable")
+            self.sorted_dates = array("i", dates[order].tobytes())
+            self.sorted_rows = array("I", order.astype(np.uint32).tobytes())
+            # Sum per (category, day) first; everything else derives from that
+            key = cats.astype(np.int64) << 32 | (dates.astype(np.int64) & 0xFFFFFFFF)
+            keys, inverse = np.unique(key, return_inverse=True)
+            totals = np.bincount(inverse.ravel(), weights=amounts)
+            cells = zip((keys >> 32).tolist(), (keys & 0xFFFFFFFF).tolist(), totals.tolist())
+        else:
+            self.sorted_rows = array("I", sorted(range(len(store)), key=store.dates.__getitem__))
+            self.sorted_dates = array("i", (store.dates[i] for i in self.sorted_rows))
+            sums: Dict[Tuple[int, int], float] = {}
+            for c, d, a in zip(store.cats, store.dates, store.amounts):
+                sums[c, d] = sums.get((c, d), 0.0) + a
+            cells = ((c, d, a) for (c, d), a in sums.items())
+        overall = self._day[None]
+        for code, day, amount in cells:
+            self._day.setdefault(code, {})[day] = amount
+            overall[day] = overall.get(day, 0.0) + amount
+        months = {}
+        for key, days in self._day.items():
+            for day, amount in days.items():
+                ym = months.get(day)
+                if ym is None:
+                    d = date.fromordinal(day)
+                    ym = months[day] = (d.year, d.month)
+                k = (key,) + ym
+                self._month[k] = self._month.get(k, 0.0) + amount
+        for (key, y, _), amount in self._month.items():
+            self._year[key, y] = self._year.get((key, y), 0.0) + amount
+
+    def _count(self, code: int, day: int, amount: float) -> None:
+        d = date.fromordinal(day)
+        for key in (None, code):
+            days = self._day.setdefault(key, {})
+            days[day] = days.get(day, 0.0) + amount
+            self._month[key, d.year, d.month] = self._month.get((key, d.year, d.month), 0.0) + amount
+            self._year[key, d.year] = self._year.get((key, d.year), 0.0) + amount
+            self._prefix.pop(key, None)
+
+    def add(self, row: int) -> None:
+        """Index a row just appended to the store."""
+        day = self.store.dates[row]
+        i = bisect_right(self.sorted_dates, day)  # usually the end: a plain append
+        self.sorted_dates.insert(i, day)
+        self.sorted_rows.insert(i, row)
+        self._count(self.store.cats[row], day, self.store.amounts[row])
+
+    def _code(self, category: Optional[str]) -> Optional[int]:
+        if category is None:
+            return None
+        return self.store._codes.get(category, -1)
+
+    def _prefix_sums(self, code: Optional[int]) -> Tuple[List[int], List[float]]:
+        cached = self._prefix.get(code)
+        if cached is None:
+            totals = self._day.get(code, {})
+            days = sorted(totals)
+            prefix = [0.0]
+            for day in days:
+                prefix.append(prefix[-1] + totals[day])
+            cached = self._prefix[code] = (days, prefix)
+        return cached
+
+    # -- queries -----------------------------------------------------------
+
+    def spent_between(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                      category: Optional[str] = None) -> float:
+        """Total spent from start to end (inclusive), optionally in one category."""
+        days, prefix = self._prefix_sums(self._code(category))
+        lo = 0 if start is None else bisect_left(days, _ordinal(start))
+        hi = len(days) if end is None else bisect_right(days, _ordinal(end))
+        return prefix[hi] - prefix[lo] if hi > lo else 0.0
+
+    def rows_between(self, start: Optional[DateLike] = None,
+                     end: Optional[DateLike] = None) -> array:
+        """Row numbers of the expenses from start to end, in date order."""
+        lo = 0 if start is None else bisect_left(self.sorted_dates, _ordinal(start))
+        hi = len(self.sorted_dates) if end is None else bisect_right(self.sorted_dates,
+                                                                     _ordinal(end))
+        return self.sorted_rows[lo:hi]
+
+    def daily(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+              category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(day ordinal, total) for each day with expenses from start to end."""
+        code = self._code(category)
+        days, _ = self._prefix_sums(code)
+        lo = 0 if start is None else bisect_left(days, _ordinal(start))
+        hi = len(days) if end is None else bisect_right(days, _ordinal(end))
+        totals = self._day.get(code, {})
+        return [(day, totals[day]) for day in days[lo:hi]]
+
+    def month_total(self, year: int, month: int, category: Optional[str] = None) -> float:
+        return self._month.get((self._code(category), year, month), 0.0)
+
+    def year_total(self, year: int, category: Optional[str] = None) -> float:
+        return self._year.get((self._code(category), year), 0.0)
+
+    def monthly(self, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """("YYYY-MM", total) for every month with expenses, in order."""
+        code = self._code(category)
+        return sorted((f"{y:04d}-{m:02d}", total)
+                      for (c, y, m), total in self._month.items() if c == code)
+
+    def yearly(self, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        code = self._code(category)
+        return sorted((y, total) for (c, y), total in self._year.items() if c == code)
+
+
+# -- persistence ---------------------------------------------------------------
+
+def write_snapshot(path: str, store: ExpenseStore, budget: Dict[str, float]) -> None:
+    """Atomically write every expense and the budget to path."""
+    header = {"format": SNAPSHOT_FORMAT, "rows": len(store), "byteorder": sys.byteorder,
+              "categories": store.categories, "budget": budget}
+    with durable.open_atomic(path) as f:
+        f.write(json.dumps(header).encode("utf-8") + b"\n")
+        for column in (store.amounts, store.dates, store.cats):
+            column.tofile(f)
+        for start in range(0, len(store), SNAPSHOT_CHUNK):
+            chunk = store.descriptions[start:start + SNAPSHOT_CHUNK]
+            f.write(json.dumps(chunk).encode("utf-8") + b"\n")
+
+
+def read_snapshot(path: str) -> Tuple[ExpenseStore, Dict[str, float]]:
+    store = ExpenseStore()
+    with open(path, "rb") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is not an expense snapshot")
+        rows = header["rows"]
+        for column in (store.amounts, store.dates, store.cats):
+            try:
+                column.fromfile(f, rows)
+            except EOFError:
+                raise ValueError(f"{path} is truncated")
+            if header["byteorder"] != sys.byteorder:
+                column.byteswap()
+        while len(store.descriptions) < rows:
+            store.descriptions.extend(json.loads(f.readline()))
+    for name in header["categories"]:
+        store.category_code(name)
+    return store, header["budget"]
+
+
+def append_journal(path: str, entries: Iterable[Dict[str, Any]]) -> None:
+    durable.append_lines(path, [json.dumps(e, separators=(",", ":")) + "\n" for e in entries])
+
+
+def replay_journal(path: str, store: ExpenseStore, budget: Dict[str, float]) -> int:
+    """Apply a journal to store and budget; returns how many entries it had."""
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write from a crash
+            if "expense" in entry:
+                store.add(entry["expense"])
+            elif "budget" in entry:
+                budget[entry["budget"]["category"]] = entry["budget"]["amount"]
+            count += 1
+    return count
@@ -1,19 +1,39 @@
+import argparse
+import csv
+import glob
 import json
 import os
 from datetime import datetime
 
+import expense_store
+from expense_import import DEFAULT_CATEGORY, Importer
+from expense_store import ExpenseStore
+
 # ---------------------------
 # Global Variables
 # ---------------------------
-expenses = []
+expenses = ExpenseStore()  # columnar; iterates as the usual expense dicts
 budget = {}
 
+# Every change is appended to the journal as it happens; saving folds the
+# journal into the snapshot (see expense_store). expenses.json is the old
+# single-document format, converted on first load.
+SNAPSHOT_FILE = "expenses.snapshot"
+JOURNAL_FILE = "expenses.jsonl"
+LEGACY_FILE = "expenses.json"
+COMPACT_MIN_ENTRIES = 10000  # snapshot on load once the journal is this long
+journal_entries = 0
+
+# Running totals live in expenses.index (a sorted date index with daily,
+# monthly and yearly rollups), so budget status and date-range reports
+# don't rescan every expense.
+
 # ---------------------------
-# Add Expense with MM-DD-20YY
+# Read a Date as MM-DD-20YY
 # ---------------------------
-def add_expense():
+def ask_date(prompt):
     while True:
-        date_input = input("Enter the date (MM-DD-YY): ")
+        date_input = input(prompt)
         try:
             # Assume the user enters a 2-digit year (e.g., 25), and we treat it as 2025
             mm, dd, yy = date_input.split("-")
@@ -22,12 +42,16 @@ def add_expense():
 
             # Validate the constructed full date
             date_obj = datetime.strptime(full_date_str, "%m-%d-%Y")
-            date = date_obj.strftime("%m-%d-%Y")
-            break
+            return date_obj.strftime("%m-%d-%Y")
 
         except ValueError:
             print("Invalid format or date. Please enter the date as MM-DD-YY (e.g., 08-05-25)\n")
 
+# ---------------------------
+# Add Expense
+# ---------------------------
+def add_expense():
+    date = ask_date("Enter the date (MM-DD-YY): ")
     category = input("Enter the category (e.g., Food, Rent, Transport): ")
     amount = float(input("Enter the amount spent: "))
     description = input("Enter a short description (optional): ")
@@ -38,7 +62,8 @@ def add_expense():
         "amount": amount,
         "description": description
     }
-    expenses.append(expense)
+    expenses.add(expense)
+    journal({"expense": expense})
     print("Expense added successfully!\n")
 
 # ---------------------------
@@ -53,6 +78,59 @@ def view_expenses():
         print(f"{i}. {exp['date']} | {exp['category']} | ${exp['amount']:.2f} | {exp['description']}")
     print()
 
+# ---------------------------
+# View Spending Between Dates
+# ---------------------------
+def view_spending_between():
+    start = ask_date("Enter the start date (MM-DD-YY): ")
+    end = ask_date("Enter the end date (MM-DD-YY): ")
+    rows = expenses.index.rows_between(start, end)
+    if not rows:
+        print(f"No expenses from {start} to {end}.\n")
+        return
+    print(f"\n--- Expenses from {start} to {end} ---")
+    for row in rows:
+        exp = expenses[row]
+        print(f"{exp['date']} | {exp['category']} | ${exp['amount']:.2f} | {exp['description']}")
+    print(f"Total: ${expenses.index.spent_between(start, end):.2f}\n")
+
+# ---------------------------
+# Import CSV Statements
+# ---------------------------
+def import_files(paths, category=DEFAULT_CATEGORY):
+    """Import CSV files (see expense_import) and persist them as one batch."""
+    importer = Importer(expenses, category)
+    for path in paths:
+        try:
+            result = importer.read(path)
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"{path}: skipped, nothing imported from it ({e})")
+            continue
+        print(f"{path}: {result.added} new, {result.duplicates} duplicates, "
+              f"{len(result.errors)} bad rows")
+        for line, message in result.errors[:5]:
+            print(f"  line {line}: {message}")
+    rows = importer.commit()
+    if rows is None:
+        print("No new expenses to import.\n")
+        return
+    # A small import is one journal write (one fsync); a big one goes
+    # straight into a new snapshot rather than a journal line per row
+    if journal_entries + len(rows) >= COMPACT_MIN_ENTRIES:
+        save_data()
+    else:
+        journal(*({"expense": e} for e in rows))
+    print(f"Imported {len(rows)} expenses.\n")
+
+def import_csv():
+    patterns = input("Enter CSV file paths (wildcards allowed): ").split()
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    if not paths:
+        print("No matching files.\n")
+        return
+    category = input(f"Category for rows without one [{DEFAULT_CATEGORY}]: ").strip()
+    import_files(paths, category or DEFAULT_CATEGORY)
+
 # ---------------------------
 # Set Monthly Budget
 # ---------------------------
@@ -60,6 +138,7 @@ def set_budget():
     category = input("Enter the category to set a budget for: ")
     amount = float(input(f"Enter monthly budget for {category}: $"))
     budget[category] = amount
+    journal({"budget": {"category": category, "amount": amount}})
     print("Budget set successfully!\n")
 
 # ---------------------------
@@ -70,39 +149,57 @@ def view_budget_status():
         print("No budgets set.\n")
         return
     
-    print("\n--- Budget Status ---")
-    spent = {}
-    for exp in expenses:
-        spent[exp['category']] = spent.get(exp['category'], 0) + exp['amount']
-
+    # Budgets are monthly, so compare against this month's spending only
+    now = datetime.now()
+    print(f"\n--- Budget Status ({now:%Y-%m}) ---")
     for cat, limit in budget.items():
-        used = spent.get(cat, 0)
+        used = expenses.index.month_total(now.year, now.month, cat)
         print(f"{cat}: Spent ${used:.2f} of ${limit:.2f} budget")
     print()
 
 # ---------------------------
 # Save Data to File
 # ---------------------------
+def journal(*entries):
+    """Append changes to the journal: O(1) per expense, one fsync per call."""
+    global journal_entries
+    expense_store.append_journal(JOURNAL_FILE, entries)
+    journal_entries += len(entries)
+
 def save_data():
-    data = {
-        "expenses": expenses,
-        "budget": budget
-    }
-    with open("expenses.json", "w") as f:
-        json.dump(data, f, indent=4)
+    """Snapshot everything and start a new journal (compaction)."""
+    global journal_entries
+    # Written to a temp file and renamed, so a crash can't truncate the data;
+    # the journal is only dropped once the snapshot is in place
+    expense_store.write_snapshot(SNAPSHOT_FILE, expenses, budget)
+    if os.path.exists(JOURNAL_FILE):
+        os.remove(JOURNAL_FILE)
+    journal_entries = 0
     print("Data saved successfully!\n")
 
 # ---------------------------
 # Load Data from File
 # ---------------------------
 def load_data():
-    global expenses, budget
-    if os.path.exists("expenses.json"):
-        with open("expenses.json", "r") as f:
+    global expenses, budget, journal_entries
+    if os.path.exists(SNAPSHOT_FILE) or os.path.exists(JOURNAL_FILE):
+        expenses, budget = ExpenseStore(), {}
+        if os.path.exists(SNAPSHOT_FILE):
+            expenses, budget = expense_store.read_snapshot(SNAPSHOT_FILE)
+        journal_entries = 0
+        if os.path.exists(JOURNAL_FILE):
+            journal_entries = expense_store.replay_journal(JOURNAL_FILE, expenses, budget)
+        print("Data loaded successfully!\n")
+        if journal_entries >= COMPACT_MIN_ENTRIES:
+            save_data()
+    elif os.path.exists(LEGACY_FILE):
+        with open(LEGACY_FILE, "r") as f:
             data = json.load(f)
-            expenses = data.get("expenses", [])
+            expenses = ExpenseStore.from_dicts(data.get("expenses", []))
             budget = data.get("budget", {})
-        print("Data loaded successfully!\n")
+        save_data()
+        os.replace(LEGACY_FILE, LEGACY_FILE + ".bak")
+        print(f"Converted {LEGACY_FILE} (kept as {LEGACY_FILE}.bak).\n")
     else:
         print("No saved data found.\n")
 
@@ -119,10 +216,12 @@ def main():
         print("2. View Expenses")
         print("3. Set Monthly Budget")
         print("4. View Budget Status")
-        print("5. Save Data")
-        print("6. Load Data")
-        print("7. Exit")
-        choice = input("Enter your choice (1-7): ")
+        print("5. View Spending Between Dates")
+        print("6. Import CSV Statements")
+        print("7. Save Data")
+        print("8. Load Data")
+        print("9. Exit")
+        choice = input("Enter your choice (1-9): ")
 
         if choice == '1':
             add_expense()
@@ -133,10 +232,14 @@ def main():
         elif choice == '4':
             view_budget_status()
         elif choice == '5':
-            save_data()
+            view_spending_between()
         elif choice == '6':
-            load_data()
+            import_csv()
         elif choice == '7':
+            save_data()
+        elif choice == '8':
+            load_data()
+        elif choice == '9':
             print("Goodbye! Stay on top of your spending habits!")
             break
         else:
@@ -145,8 +248,24 @@ def main():
 # ---------------------------
 # Run the Program
 # ---------------------------
+def cli(argv=None):
+    p = argparse.ArgumentParser(description="Personal expense tracker "
+                                            "(interactive menu when run without a command)")
+    sub = p.add_subparsers(dest="command")
+    imp = sub.add_parser("import", help="Import CSV statements (see expense_import)")
+    imp.add_argument("files", nargs="+", help="CSV files with a header row")
+    imp.add_argument("--category", default=DEFAULT_CATEGORY,
+                     help="Category for rows without one (default: %(default)s)")
+    args = p.parse_args(argv)
+
+    if args.command == "import":
+        load_data()
+        import_files(args.files, args.category)
+    else:
+        main()
+
 if __name__ == "__main__":
-    main()
+    cli()
 
 
 
@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
 # cli.py - fresh build
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from safe_eval import evaluate
 
 BANNER = """\
@@ -13,7 +20,7 @@ Examples:
 Type 'quit' to exit.
 """
 
-def main():
+def main(backend=None):
     print(BANNER)
     while True:
         try:
@@ -24,7 +31,7 @@ def main():
             if not s:
                 continue
             try:
-                print(evaluate(s))
+                print(evaluate(s, backend=backend))
             except ZeroDivisionError as zde:
                 print("Error:", zde)
             except Exception as e:
@@ -33,5 +40,81 @@ def main():
             print("\nBye!")
             break
 
+# ---------------------------------------------------------------------------
+# Batch mode: stream expressions, one per line, through a process pool
+# ---------------------------------------------------------------------------
+
+def eval_lines(lines, backend=None):
+    """Evaluate a chunk of lines; one output line per input line."""
+    out = []
+    for s in lines:
+        s = s.strip()
+        if not s:
+            out.append("")
+            continue
+        try:
+            out.append(str(evaluate(s, backend=backend)))
+        except Exception as e:
+            out.append(f"Error: {e}")
+    return out
+
+def _chunks(src, size):
+    while True:
+        chunk = list(islice(src, size))
+        if not chunk:
+            return
+        yield chunk
+
+def run_batch(src, dst, jobs=None, chunk_size=1000, backend=None):
+    """
+    Evaluate every line of `src` and write results to `dst` in input order.
+
+    Lines are read in chunks of `chunk_size` and handed to `jobs` worker
+    processes. At most two chunks per worker are in flight, so memory stays
+    bounded no matter how large the input is.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for chunk in _chunks(src, chunk_size):
+            dst.writelines(r + "\n" for r in eval_lines(chunk, backend))
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for chunk in _chunks(src, chunk_size):
+            pending.append(pool.submit(eval_lines, chunk, backend))
+            if len(pending) >= jobs * 2:
+                dst.writelines(r + "\n" for r in pending.popleft().result())
+        while pending:
+            dst.writelines(r + "\n" for r in pending.popleft().result())
+
+def positive_int(s: str) -> int:
+    n = int(s)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"expected a number >= 1, got {n}")
+    return n
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Calculator CLI (interactive REPL by default).")
+    p.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                   help="Evaluate one expression per line from FILE (or stdin) instead of the REPL")
+    p.add_argument("--jobs", type=positive_int, default=None,
+                   help="Worker processes for --batch (default: all cores)")
+    p.add_argument("--chunk-size", type=positive_int, default=1000,
+                   help="Lines handed to a worker at a time (default 1000)")
+    p.add_argument("--backend", choices=["float", "decimal", "fraction"], default="float",
+                   help="Number type: float (default), exact decimal, or fraction")
+    return p
+
+def cli():
+    args = build_parser().parse_args()
+    if args.batch is None:
+        main(args.backend)
+        return
+    if args.batch == "-":
+        run_batch(sys.stdin, sys.stdout, args.jobs, args.chunk_size, args.backend)
+    else:
+        with open(args.batch, "r", encoding="utf-8") as f:
+            run_batch(f, sys.stdout, args.jobs, args.chunk_size, args.backend)
+
 if __name__ == "__main__":
-    main()
+    cli()
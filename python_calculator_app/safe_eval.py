@@ -1,6 +1,6 @@
 # safe_eval.py
 """
-Safe arithmetic evaluator using Python's AST.
+Safe arithmetic evaluator.
 
 Allowed:
   - numeric literals (int/float)
@@ -9,11 +9,46 @@ Allowed:
   - unary operators: + -
 
 Everything else raises ValueError.
+
+Expressions are tokenized and checked once, then turned into a flat postfix
+program by an iterative (shunting-yard) parser, so very long expressions do
+not hit the recursion limit. An optimization pass then folds constant
+subtrees and numbers identical subtrees once (common-subexpression
+elimination), producing a straight-line register program. Programs are kept
+in a bounded LRU cache keyed on the expression string. Evaluating the
+same expression again skips parsing and validation entirely; see
+cache_info() for hit/miss/eviction counters.
+
+Every call is checked against resource Limits (node count, nesting depth,
+the estimated bit length of each integer ** and * result, and of all of
+them together) before any expensive work runs, so inputs like 9**9**9**9,
+or a thousand terms that are each just under the per-result limit, fail
+fast with LimitExceeded.
+
+evaluate_batch() runs one expression over whole columns of inputs, binding
+variable names to NumPy arrays (or array.array / sequences when NumPy is not
+installed).
+
+Numbers are Python int/float by default. Pass backend="decimal" (or a
+DecimalBackend with its own decimal.Context) for exact decimal money math,
+or backend="fraction" for exact rational results.
 """
 
 import ast
+import decimal
+import math
 import operator as op
-from typing import Union
+import re
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from fractions import Fraction
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # optional; evaluate_batch falls back to array.array
+    np = None
 
 # Binary and unary operator tables
 _BIN = {
@@ -31,9 +66,116 @@ _UNARY = {
     ast.USub: op.neg,
 }
 
-Number = Union[int, float]
+# Operators that need the divide/mod by zero guard
+_DIVIDING = (op.truediv, op.floordiv, op.mod)
+
+Number = Union[int, float, decimal.Decimal, Fraction]
+
+class LimitExceeded(ValueError):
+    """Raised when an expression would exceed the configured Limits."""
+
+class Limits(NamedTuple):
+    """
+    Per-call resource limits.
+
+    max_nodes: numbers, names and operators in the expression
+    max_depth: parenthesis nesting / operand stack depth of the expression
+    max_bits:  estimated bit length of an integer ** or * result
+    max_total_bits: the same estimate added up over every ** and *, both
+               folded at compile time and computed at run time; bounds
+               the total work (and memory) one expression can take
+    """
+    max_nodes: int = 1_000_000
+    max_depth: int = 10_000
+    max_bits: int = 1_000_000
+    max_total_bits: int = 10_000_000
+
+DEFAULT_LIMITS = Limits()
+
+# ---------------------------------------------------------------------------
+# Numeric backends
+# ---------------------------------------------------------------------------
+# Literals are converted once, at compile time, by the backend's from_int /
+# from_float; the parser already knows which kind of literal it read, so no
+# per-node type checks are needed and run time only sees backend numbers.
+
+class Backend:
+    """Python int/float arithmetic (the default)."""
+    name = "float"
+    types: Tuple[type, ...] = (int, float)
+    context: Optional[decimal.Context] = None  # decimal context to run under
+    overrides: Dict[Any, Any] = {}  # operator function -> replacement
+
+    @property
+    def key(self):
+        """Identifies compiled programs that can be shared in the cache."""
+        return self.name
+
+    def from_int(self, value: int) -> Number:
+        return value
+
+    def from_float(self, text: str) -> Number:
+        return float(text)
+
+class DecimalBackend(Backend):
+    """
+    decimal.Decimal arithmetic. Literals are exact (0.1 is Decimal("0.1"));
+    operations round according to `context` (default: decimal.Context()).
+    Note that // and % truncate toward zero, as Decimal does.
+    """
+    name = "decimal"
+    types = (decimal.Decimal,)
+
+    def __init__(self, context: Optional[decimal.Context] = None):
+        self.context = (context or decimal.Context()).copy()
+
+    @property
+    def key(self):
+        c = self.context
+        traps = tuple(sorted(t.__name__ for t, on in c.traps.items() if on))
+        return (self.name, c.prec, c.rounding, c.Emin, c.Emax, c.clamp, traps)
+
+    def from_int(self, value: int) -> Number:
+        return decimal.Decimal(value)
+
+    def from_float(self, text: str) -> Number:
+        return decimal.Decimal(text.replace("_", ""))
+
+def _fraction_floordiv(a: Fraction, b: Fraction) -> Fraction:
+    return Fraction(a // b)  # Fraction // Fraction returns an int
+
+class FractionBackend(Backend):
+    """
+    Exact fractions.Fraction arithmetic. Powers with a non-integer exponent
+    have no exact result and are rejected.
+    """
+    name = "fraction"
+    types = (Fraction,)
+    overrides = {op.floordiv: _fraction_floordiv}
+
+    def from_int(self, value: int) -> Number:
+        return Fraction(value)
+
+    def from_float(self, text: str) -> Number:
+        return Fraction(text.replace("_", ""))
+
+FLOAT = Backend()
+DECIMAL = DecimalBackend()
+FRACTION = FractionBackend()
+_BACKENDS = {b.name: b for b in (FLOAT, DECIMAL, FRACTION)}
+
+def _backend(backend: Union[str, Backend, None]) -> Backend:
+    if backend is None:
+        return FLOAT
+    if isinstance(backend, Backend):
+        return backend
+    try:
+        return _BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown backend: {backend!r}")
 
 def _eval(node: ast.AST) -> Number:
+    """Recursive reference evaluator over ast.parse() output (see benchmarks)."""
     if isinstance(node, ast.Expression):
         return _eval(node.body)
     if isinstance(node, ast.BinOp):
@@ -61,17 +203,600 @@ def _eval(node: ast.AST) -> Number:
     # Disallow names, calls, attributes, etc.
     raise ValueError(f"Unsupported expression: {type(node).__name__}")
 
-def evaluate(expr: str) -> Number:
+# ---------------------------------------------------------------------------
+# Compiled form
+# ---------------------------------------------------------------------------
+# The parser emits postfix code, a list of (kind, arg) instructions:
+#   _K_CONST  push arg
+#   _K_LOAD   push the value bound to variable arg (evaluate_batch only)
+#   _K_UNARY  replace top of stack with arg(top)
+#   _K_BINARY pop right, pop left, push arg(left, right)
+#   _K_DIVIDE like _K_BINARY, but raise ZeroDivisionError when right == 0
+#   _K_GUARD  like _K_BINARY for ** and *, but first estimate the size of an
+#             integer result and raise LimitExceeded if it is too large
+#
+# _optimize() turns that into a Program: registers start out holding the
+# constants and variables (init/loads), and each (kind, fn, a, b) op appends
+# fn(regs[a], regs[b]) (or fn(regs[a]) for unary ops) as the next register.
+_K_CONST, _K_UNARY, _K_BINARY, _K_DIVIDE, _K_GUARD, _K_LOAD = range(6)
+
+Code = List[Tuple[int, object]]
+
+class Program(NamedTuple):
+    ops: Tuple[Tuple[int, Any, int, int], ...]
+    init: Tuple[Any, ...]               # initial registers (None for variables)
+    loads: Tuple[Tuple[int, str], ...]  # (register, variable name)
+    result: int                         # register holding the final value
+    nodes: int                          # size of the source expression
+    depth: int                          # nesting depth of the source expression
+    bits: int                           # largest integer ** / * folded at compile time
+    total_bits: int                     # all of them added up
+
+# ---------------------------------------------------------------------------
+# Parser
+# ---------------------------------------------------------------------------
+# ast.parse (and the recursive _eval above) recurse once per nesting level,
+# so long generated expressions such as 1+1+...+1 hit the recursion limit.
+# The tokenizer and shunting-yard parser below build the postfix program
+# directly with explicit stacks, in time linear in the input length.
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<num>
+            0[xX](?:_?[0-9a-fA-F])+ | 0[oO](?:_?[0-7])+ | 0[bB](?:_?[01])+
+          | (?:\d(?:_?\d)*(?:\.(?:\d(?:_?\d)*)?)? | \.\d(?:_?\d)*)
+            (?:[eE][+-]?\d(?:_?\d)*)?
+        )
+      | (?P<name>[^\W\d]\w*)
+      | (?P<op>\*\*|//|[-+*/%()])
+      | (?P<bad>\S)
+    )""", re.VERBOSE | re.ASCII)  # \d and \w would also match non-ASCII digits
+
+_BIN_TOKENS = {
+    "+": ast.Add, "-": ast.Sub, "*": ast.Mult, "/": ast.Div,
+    "//": ast.FloorDiv, "%": ast.Mod, "**": ast.Pow,
+}
+_UNARY_TOKENS = {"+": ast.UAdd, "-": ast.USub}
+
+# Python's precedence: + - < * / // % < unary + - < **; only ** is right
+# associative, and unary operators bind looser than ** on their right
+# (-2**2 == -4, 2**-1 == 0.5).
+_PREC_UNARY = 3
+_BIN_PREC = {"+": 1, "-": 1, "*": 2, "/": 2, "//": 2, "%": 2, "**": 4}
+
+def _binary_kind(fn) -> int:
+    if fn in _DIVIDING:
+        return _K_DIVIDE
+    if fn is op.pow or fn is op.mul:
+        return _K_GUARD
+    return _K_BINARY
+
+# Token -> (precedence, instruction), built once instead of per token
+_BIN_INSTR = {tok: (_BIN_PREC[tok], (_binary_kind(_BIN[node]), _BIN[node]))
+              for tok, node in _BIN_TOKENS.items()}
+_UNARY_INSTR = {tok: (_PREC_UNARY, (_K_UNARY, _UNARY[node]))
+                for tok, node in _UNARY_TOKENS.items()}
+
+def _binary_instr(tok: str, backend: Backend):
+    entry = _BIN_INSTR[tok]
+    if backend.overrides:
+        kind, fn = entry[1]
+        entry = (entry[0], (kind, backend.overrides.get(fn, fn)))
+    return entry
+
+def _number(text: str, backend: Backend) -> Number:
+    if text.isdigit() and (text[0] != "0" or len(text) == 1):
+        return backend.from_int(int(text))
+    if "." in text:
+        return backend.from_float(text)
+    if text[:2].lower() in ("0x", "0o", "0b"):
+        return backend.from_int(int(text, 0))
+    if "e" in text or "E" in text:
+        return backend.from_float(text)
+    return backend.from_int(int(text, 0))  # rejects leading zeros like Python does
+
+def _parse(expr: str, max_nodes: int, backend: Backend) -> Tuple[Code, int]:
     """
-    Parse and evaluate a safe arithmetic expression.
+    Tokenize and validate an expression into postfix code; returns the code
+    and its nesting depth. Parsing stops as soon as the expression has more
+    than max_nodes nodes.
+    """
+    out = []
+    ops = []  # (precedence, instruction); None marks an open parenthesis
+    expect_operand = True
+    nodes = nesting = max_nesting = 0
+    end = len(expr)
+    # Every position but trailing whitespace starts a match (`bad` takes any
+    # other character), so finditer never skips input
+    for m in _TOKEN.finditer(expr):
+        kind = m.lastgroup
+        tok = m[kind]
+        if kind == "bad":
+            raise ValueError(f"Unsupported character: {tok!r}")
+        if tok != "(" and tok != ")":
+            nodes += 1
+            if nodes > max_nodes:
+                raise LimitExceeded(f"Expression has more than {max_nodes} nodes")
+        if expect_operand:
+            if kind == "num" or kind == "name":
+                pos = m.end()
+                if pos < end and (expr[pos].isalnum() or expr[pos] in "_."):
+                    if kind == "num" and expr[pos] in "jJ":
+                        raise ValueError("Only numeric literals allowed")
+                    raise ValueError("Invalid syntax")
+                if kind == "num":
+                    try:
+                        out.append((_K_CONST, _number(tok, backend)))
+                    except (ValueError, ArithmeticError):
+                        raise ValueError("Invalid syntax")
+                else:
+                    out.append((_K_LOAD, tok))
+                expect_operand = False
+            elif tok in _UNARY_INSTR:
+                ops.append(_UNARY_INSTR[tok])
+            elif tok == "(":
+                ops.append(None)
+                nesting += 1
+                max_nesting = max(max_nesting, nesting)
+            else:
+                raise ValueError("Invalid syntax")
+        elif tok == ")":
+            while ops and ops[-1] is not None:
+                out.append(ops.pop()[1])
+            if not ops:
+                raise ValueError("Invalid syntax")
+            ops.pop()
+            nesting -= 1
+        elif kind == "op" and tok in _BIN_INSTR:
+            entry = _binary_instr(tok, backend)
+            prec = entry[0]
+            right_assoc = tok == "**"
+            while ops and ops[-1] is not None:
+                top = ops[-1][0]
+                if top > prec or (top == prec and not right_assoc):
+                    out.append(ops.pop()[1])
+                else:
+                    break
+            ops.append(entry)
+            expect_operand = True
+        else:
+            raise ValueError("Invalid syntax")
+    if expect_operand:
+        raise ValueError("Invalid syntax")
+    while ops:
+        entry = ops.pop()
+        if entry is None:
+            raise ValueError("Invalid syntax")
+        out.append(entry[1])
+    # Operands held at once by a stack evaluator
+    held = max_held = 0
+    for kind, _ in out:
+        if kind == _K_CONST or kind == _K_LOAD:
+            held += 1
+            if held > max_held:
+                max_held = held
+        elif kind != _K_UNARY:
+            held -= 1
+    return out, max(max_nesting, max_held)
+
+def _size_bits(x) -> int:
+    """Bits needed to hold an exact number; 0 for fixed-precision types."""
+    t = type(x)
+    if t is int:
+        return x.bit_length()
+    if t is Fraction:
+        return x.numerator.bit_length() + x.denominator.bit_length()
+    return 0  # float, Decimal: precision is bounded, overflow raises
+
+def _result_bits(fn, left, right) -> int:
+    """Estimated bit length of the exact result of left ** right or left * right."""
+    left_bits = _size_bits(left)
+    if not left_bits:
+        return 0
+    if fn is op.mul:
+        return left_bits + _size_bits(right)
+    if type(right) is int:
+        exponent = right
+    elif type(right) is Fraction and right.denominator == 1:
+        exponent = right.numerator
+    else:
+        return 1  # non-integer exponent: float result
+    if left in (0, 1, -1) or (exponent < 0 and type(left) is int):
+        return 1  # trivial, or int ** negative int is a float
+    return left_bits * abs(exponent)
+
+# ---------------------------------------------------------------------------
+# Optimizer
+# ---------------------------------------------------------------------------
+# Folding never changes error behaviour: an operation that would raise
+# (division by zero, overflow, a complex result) or that is too large to
+# compute eagerly is left in the program and fails at run time as before.
+_FOLD_MAX_BITS = DEFAULT_LIMITS.max_bits
+_FOLD_MAX_TOTAL_BITS = DEFAULT_LIMITS.max_total_bits
+_COMMUTATIVE = (op.add, op.mul)
+
+def _fold(kind: int, fn, args: Tuple[Any, ...], types,
+          budget: int) -> Tuple[bool, Any, int]:
+    """Try to compute an operation on constants: (folded, value, bits)."""
+    bits = 0
+    if kind == _K_DIVIDE and args[1] == 0:
+        return False, None, 0
+    if kind == _K_GUARD:
+        bits = _result_bits(fn, args[0], args[1])
+        if bits > _FOLD_MAX_BITS or bits > budget:
+            return False, None, 0
+    try:
+        value = fn(*args)
+    except (ArithmeticError, ValueError, TypeError):
+        return False, None, 0
+    if not isinstance(value, types):
+        return False, None, 0
+    return True, value, bits
+
+def _leaf_key(kind: int, value) -> tuple:
+    # Type plus repr keeps 0.0/-0.0 and 1/1.0 apart; ints are used as-is
+    # because repr() of a huge int is slow (or refused).
+    return (kind, type(value), value if type(value) is int else repr(value))
+
+def _fold_all(code: Code, depth: int, types) -> Optional[Program]:
+    """
+    The one-constant program for code without variables, or None if an
+    operation can't be folded (it must then fail at run time instead).
+    """
+    stack = []
+    push, pop = stack.append, stack.pop
+    bits = total_bits = 0
+    for kind, arg in code:
+        if kind == _K_CONST:
+            push(arg)
+            continue
+        if kind == _K_LOAD:
+            return None
+        if kind == _K_UNARY:
+            args = (pop(),)
+        else:
+            right = pop()
+            args = (pop(), right)
+        folded, value, op_bits = _fold(kind, arg, args, types, _FOLD_MAX_TOTAL_BITS - total_bits)
+        if not folded:
+            return None
+        if op_bits:
+            bits = max(bits, op_bits)
+            total_bits += op_bits
+        push(value)
+    return Program((), (stack[-1],), (), 0, len(code), depth, bits, total_bits)
+
+def _optimize(code: Code, depth: int, backend: Backend) -> Program:
+    """
+    Fold constant subtrees and give every distinct subtree one value number
+    (hash-consing), so repeated subexpressions are computed once. Must run
+    under the backend's decimal context, if it has one.
+    """
+    # evaluate() formulas have no variables and nearly always fold to one
+    # constant: skip the numbering, which would only cost time on a miss
+    program = _fold_all(code, depth, backend.types)
+    if program is not None:
+        return program
+    numbering = {}  # structural key -> value number
+    entries = []    # value number -> (kind, arg, operand value numbers)
+    const_of = {}   # value number -> constant value, for folding
+    stack = []
+    bits = total_bits = 0
+    for kind, arg in code:
+        if kind == _K_CONST or kind == _K_LOAD:
+            operands = ()
+            key = _leaf_key(kind, arg)
+        else:
+            if kind == _K_UNARY:
+                operands = (stack.pop(),)
+            else:
+                right = stack.pop()
+                operands = (stack.pop(), right)
+            if operands[0] in const_of and operands[-1] in const_of:
+                folded, value, op_bits = _fold(kind, arg, tuple(const_of[vn] for vn in operands),
+                                               backend.types, _FOLD_MAX_TOTAL_BITS - total_bits)
+                if folded:
+                    bits = max(bits, op_bits)
+                    total_bits += op_bits
+                    kind, arg, operands = _K_CONST, value, ()
+            if operands:
+                if arg in _COMMUTATIVE and operands[0] > operands[1]:
+                    key = (kind, arg, operands[1], operands[0])
+                else:
+                    key = (kind, arg) + operands
+            else:
+                key = _leaf_key(kind, arg)
+        vn = numbering.get(key)
+        if vn is None:
+            vn = numbering[key] = len(entries)
+            entries.append((kind, arg, operands))
+            if kind == _K_CONST:
+                const_of[vn] = arg
+        stack.append(vn)
+
+    # Registers: constants and variables first, then ops in creation order
+    # (which is postfix order, so operands always precede their users and
+    # errors surface in the same order as a left-to-right evaluation).
+    # Constants only consumed by folding are dropped.
+    result = stack[-1]
+    used = {result}
+    for _, _, operands in entries:
+        used.update(operands)
+    slot = {}
+    init = []
+    loads = []
+    for vn, (kind, arg, operands) in enumerate(entries):
+        if not operands and vn in used:
+            slot[vn] = len(init)
+            if kind == _K_LOAD:
+                loads.append((len(init), arg))
+                init.append(None)
+            else:
+                init.append(arg)
+    ops = []
+    for vn, (kind, arg, operands) in enumerate(entries):
+        if operands:
+            slot[vn] = len(init) + len(ops)
+            b = slot[operands[1]] if len(operands) > 1 else -1
+            ops.append((kind, arg, slot[operands[0]], b))
+    return Program(tuple(ops), tuple(init), tuple(loads), slot[result],
+                   len(code), depth, bits, total_bits)
+
+# ---------------------------------------------------------------------------
+# Runners
+# ---------------------------------------------------------------------------
+def _load(env: Optional[Dict[str, Any]], name: str):
+    if env is None:
+        # Plain evaluate() has no variables; keep rejecting names
+        raise ValueError("Unsupported expression: Name")
+    try:
+        return env[name]
+    except KeyError:
+        raise ValueError(f"Unknown variable: {name}")
+
+def _run(program: Program, env: Optional[Dict[str, Any]] = None,
+         limits: Limits = DEFAULT_LIMITS) -> Number:
+    max_bits = limits.max_bits
+    budget = limits.max_total_bits - program.total_bits  # what folding left
+    regs = list(program.init)
+    for slot, name in program.loads:
+        regs[slot] = _load(env, name)
+    push = regs.append
+    for kind, fn, a, b in program.ops:
+        if kind == _K_BINARY:
+            push(fn(regs[a], regs[b]))
+        elif kind == _K_UNARY:
+            push(fn(regs[a]))
+        elif kind == _K_DIVIDE:
+            right = regs[b]
+            if right == 0:
+                raise ZeroDivisionError("Division by zero")
+            push(fn(regs[a], right))
+        else:
+            left = regs[a]
+            right = regs[b]
+            bits = _result_bits(fn, left, right)
+            if bits > max_bits:
+                raise LimitExceeded(f"Result would exceed {max_bits} bits")
+            budget -= bits
+            if budget < 0:
+                raise LimitExceeded(f"Results would exceed {limits.max_total_bits} bits in total")
+            push(fn(left, right))
+    return regs[program.result]
+
+def _run_vector(program: Program, env: Dict[str, Any], on_zero: str):
+    """
+    Run a program once over NumPy arrays. Division by zero is tracked as a
+    boolean mask instead of an exception; masked divisors are replaced by 1
+    so the element-wise operation itself never faults.
+    Returns (result, mask) where mask is None if no zero divisor was seen.
+    """
+    regs = list(program.init)
+    for slot, name in program.loads:
+        regs[slot] = _load(env, name)
+    push = regs.append
+    bad = None
+    for kind, fn, a, b in program.ops:
+        if kind == _K_UNARY:
+            push(fn(regs[a]))
+        elif kind == _K_DIVIDE:
+            right = regs[b]
+            zero = np.equal(right, 0)
+            if zero.any():
+                if on_zero == "raise":
+                    raise ZeroDivisionError("Division by zero")
+                bad = zero if bad is None else (bad | zero)
+                right = np.where(zero, 1, right)
+            push(fn(regs[a], right))
+        else:
+            push(fn(regs[a], regs[b]))
+    return regs[program.result], bad
+
+# ---------------------------------------------------------------------------
+# Expression cache
+# ---------------------------------------------------------------------------
+CACHE_SIZE = 4096
+
+CacheInfo = namedtuple("CacheInfo", "hits misses evictions maxsize currsize")
+
+class _LRUCache:
+    """Small thread-safe LRU map that counts hits, misses and evictions."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._trim()
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._data))
+
+    def _trim(self) -> None:
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+_cache = _LRUCache(CACHE_SIZE)
+
+def cache_info() -> CacheInfo:
+    """Return hit/miss/eviction counters and current size of the cache."""
+    return _cache.info()
+
+def cache_clear() -> None:
+    """Drop all compiled expressions and reset the counters."""
+    _cache.clear()
+
+def set_cache_size(maxsize: int) -> None:
+    """Change the number of compiled expressions kept (0 disables caching)."""
+    if maxsize < 0:
+        raise ValueError("Cache size must be >= 0")
+    _cache.resize(maxsize)
+
+def compile_expr(expr: str, limits: Optional[Limits] = None,
+                 backend: Union[str, Backend, None] = None) -> Program:
+    """
+    Parse and validate an expression, returning its compiled program.
+    Results are cached, so repeated expressions are only parsed once.
+    Raises LimitExceeded if the expression is larger or deeper than allowed.
     """
     if not isinstance(expr, str):
         raise ValueError("Expression must be a string")
-    try:
-        tree = ast.parse(expr, mode="eval")
-    except SyntaxError:
-        raise ValueError("Invalid syntax")
-    result = _eval(tree)
-    if not isinstance(result, (int, float)):
+    limits = limits or DEFAULT_LIMITS
+    backend = _backend(backend)
+    key = expr if backend is FLOAT else (backend.key, expr)
+    program = _cache.get(key)
+    if program is None:
+        if backend.context is None:
+            program = _optimize(*_parse(expr, limits.max_nodes, backend), backend)
+        else:
+            with decimal.localcontext(backend.context):
+                program = _optimize(*_parse(expr, limits.max_nodes, backend), backend)
+        _cache.put(key, program)
+    # Cached programs may have been compiled under looser limits
+    if program.nodes > limits.max_nodes:
+        raise LimitExceeded(f"Expression has more than {limits.max_nodes} nodes")
+    if program.depth > limits.max_depth:
+        raise LimitExceeded(f"Expression is nested deeper than {limits.max_depth}")
+    if program.bits > limits.max_bits:
+        raise LimitExceeded(f"Result would exceed {limits.max_bits} bits")
+    if program.total_bits > limits.max_total_bits:
+        raise LimitExceeded(f"Results would exceed {limits.max_total_bits} bits in total")
+    return program
+
+def evaluate(expr: str, limits: Optional[Limits] = None,
+             backend: Union[str, Backend, None] = None) -> Number:
+    """
+    Parse and evaluate a safe arithmetic expression.
+    Pass limits=Limits(...) to tighten or relax the resource guards, and
+    backend="decimal"/"fraction" (or a Backend instance) to change the
+    number type.
+    """
+    limits = limits or DEFAULT_LIMITS
+    backend = _backend(backend)
+    program = compile_expr(expr, limits, backend)
+    if backend.context is None:
+        result = _run(program, None, limits)
+    else:
+        with decimal.localcontext(backend.context):
+            result = _run(program, None, limits)
+    if not isinstance(result, backend.types):
         raise ValueError("Expression did not evaluate to a number")
     return result
+
+ZERO_POLICIES = ("raise", "nan", "skip")
+
+def evaluate_batch(expr: str, *, on_zero: str = "raise",
+                   limits: Optional[Limits] = None, **columns):
+    """
+    Evaluate one expression element-wise over columns of inputs.
+
+    Each keyword binds a variable name used in `expr` to a column (NumPy
+    array, array.array or any sequence); all columns must have the same
+    length. With NumPy installed the whole column is computed in one pass
+    and a NumPy array is returned; otherwise rows are evaluated one by one
+    and an array.array('d') is returned.
+
+    on_zero decides what happens to rows that divide by zero:
+      "raise" - raise ZeroDivisionError (default, same as evaluate)
+      "nan"   - put NaN in those rows
+      "skip"  - drop those rows from the result
+
+    limits bounds the expression's size, as in evaluate(), but values are
+    not checked against max_bits: rows are computed in float64 (integer
+    columns are converted first, so a**40 or a**-1 give what evaluate()
+    gives for each row, as a float), and a row too large for a float is inf.
+    """
+    if on_zero not in ZERO_POLICIES:
+        raise ValueError(f"on_zero must be one of {', '.join(ZERO_POLICIES)}")
+    if not columns:
+        raise ValueError("evaluate_batch needs at least one column")
+    sizes = {len(col) for col in columns.values()}
+    if len(sizes) != 1:
+        raise ValueError("Columns must have the same length")
+    (size,) = sizes
+    limits = limits or DEFAULT_LIMITS
+    program = compile_expr(expr, limits, FLOAT)
+
+    if np is not None:
+        env = {}
+        for name, col in columns.items():
+            col = np.asarray(col)
+            # int64 would wrap around (10**40) or refuse negative powers
+            env[name] = col.astype(np.float64) if col.dtype.kind in "biu" else col
+        result, bad = _run_vector(program, env, on_zero)
+        result = np.broadcast_to(np.asarray(result), (size,))
+        if result.dtype.kind not in "iuf":
+            raise ValueError("Expression did not evaluate to a number")
+        if bad is None:
+            return result.copy()
+        bad = np.broadcast_to(bad, (size,))
+        if on_zero == "nan":
+            result = result.astype(float)
+            result[bad] = np.nan
+            return result
+        return result[~bad]
+
+    out = array("d")
+    names = list(columns)
+    cols = [columns[name] for name in names]
+    for row in zip(*cols):
+        try:
+            value = _run(program, dict(zip(names, row)), limits)
+        except ZeroDivisionError:
+            if on_zero == "raise":
+                raise
+            if on_zero == "nan":
+                out.append(math.nan)
+            continue
+        if not isinstance(value, (int, float)):
+            raise ValueError("Expression did not evaluate to a number")
+        out.append(value)
+    return out
@@ -28,3 +28,141 @@ def test_disallowed():
             assert False, f"Should reject: {bad}"
         except Exception:
             pass
+
+def test_rejects_non_ascii_digits():
+    for bad in ["\u0661", "\u0663+1", "\uff11", "1\u00a0+1", "\u00b2"]:
+        try:
+            evaluate(bad)
+            assert False, f"Should reject: {bad!r}"
+        except ValueError:
+            pass
+
+def test_cache_reuses_compiled_program():
+    from safe_eval import cache_clear, cache_info
+    cache_clear()
+    assert evaluate("6*7") == 42
+    assert evaluate("6*7") == 42
+    info = cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert info.currsize == 1
+
+def test_batch_columns():
+    from array import array
+    from safe_eval import evaluate_batch
+    a = array("d", [1, 2, 3, 4])
+    b = array("d", [1, 0, 2, 4])
+    assert list(evaluate_batch("a*2 + b", a=a, b=b)) == [3, 4, 8, 12]
+    assert list(evaluate_batch("a/b", on_zero="skip", a=a, b=b)) == [1, 1.5, 1]
+    r = list(evaluate_batch("a/b", on_zero="nan", a=a, b=b))
+    assert r[1] != r[1] and r[0] == 1
+    try:
+        evaluate_batch("a/b", a=a, b=b)
+        assert False, "Expected ZeroDivisionError"
+    except ZeroDivisionError:
+        pass
+
+def test_batch_integer_columns_match_evaluate():
+    from safe_eval import evaluate_batch
+    rows = [(10, 40), (3, 40), (2, -1), (7, 2), (-7, 2)]
+    for expr in ["a**b", "a//b + a%b", "a*b - b"]:
+        got = list(evaluate_batch(expr, a=[a for a, _ in rows], b=[b for _, b in rows]))
+        assert got == [float(evaluate(expr.replace("a", f"({a})").replace("b", f"({b})")))
+                       for a, b in rows]
+
+def test_long_expression():
+    assert evaluate("+".join(["1"] * 100000)) == 100000
+    assert evaluate("(" * 2000 + "2" + ")" * 2000) == 2
+
+def test_precedence():
+    for e in ["-2**2", "2**-1", "2**3**2", "2*-3**2", "10//3%4", "1_000+0x1f"]:
+        assert evaluate(e) == eval(e)
+
+def test_limits():
+    from safe_eval import LimitExceeded, Limits
+    for bad in ["9**9**9**9", "2**10**9", "(10**400000)*(10**400000)"]:
+        try:
+            evaluate(bad)
+            assert False, f"Should reject: {bad}"
+        except LimitExceeded:
+            pass
+    assert evaluate("1**10**9") == 1
+    assert evaluate("2**100") == 2 ** 100
+    try:
+        evaluate("2**100", limits=Limits(max_bits=64))
+        assert False, "Expected LimitExceeded"
+    except LimitExceeded:
+        pass
+    try:
+        evaluate("1+2+3", limits=Limits(max_nodes=4))
+        assert False, "Expected LimitExceeded"
+    except LimitExceeded:
+        pass
+    try:
+        evaluate("((((1))))", limits=Limits(max_depth=3))
+        assert False, "Expected LimitExceeded"
+    except LimitExceeded:
+        pass
+
+def test_total_bits_limit():
+    from safe_eval import LimitExceeded, Limits
+    # Each term is under max_bits; together they are far over the total
+    for bad, limits in [("+".join(f"7**{330000 - i}" for i in range(1000)), None),
+                        ("2**100 * 3**100", Limits(max_total_bits=300))]:
+        try:
+            evaluate(bad, limits)
+            assert False, "Expected LimitExceeded"
+        except LimitExceeded:
+            pass
+    assert evaluate("2**100 * 3**100", Limits(max_total_bits=1000)) == 6 ** 100
+    assert evaluate("+".join(f"7**{3000 - i}" for i in range(100))) > 0
+
+def test_folding_and_cse():
+    from safe_eval import compile_expr, evaluate_batch
+    program = compile_expr("(1+2)*(1+2)")
+    assert program.ops == () and program.init == (9,)
+    program = compile_expr("(a+b)*(b+a)")
+    assert len(program.ops) == 2  # a+b computed once
+    assert list(evaluate_batch("(a+b)*(b+a)", a=[1, 2], b=[3, 4])) == [16, 36]
+    # Folding keeps run-time errors where they were
+    for bad in ["1/0", "2 + 5 % (3-3)"]:
+        try:
+            evaluate(bad)
+            assert False, "Expected ZeroDivisionError"
+        except ZeroDivisionError:
+            pass
+    assert str(evaluate("-0.0")) == "-0.0"
+
+def test_backends():
+    from decimal import Context, Decimal
+    from fractions import Fraction
+    from safe_eval import DecimalBackend, LimitExceeded
+    assert evaluate("0.1 + 0.2", backend="decimal") == Decimal("0.3")
+    assert evaluate("1/3 + 1/6", backend="fraction") == Fraction(1, 2)
+    assert evaluate("1/3", backend=DecimalBackend(Context(prec=5))) == Decimal("0.33333")
+    assert evaluate("0.1 + 0.2") == 0.1 + 0.2  # float stays the default
+    try:
+        evaluate("9**9**9", backend="fraction")
+        assert False, "Expected LimitExceeded"
+    except LimitExceeded:
+        pass
+    try:
+        evaluate("1/0", backend="decimal")
+        assert False, "Expected ZeroDivisionError"
+    except ZeroDivisionError:
+        pass
+
+def test_run_batch_keeps_order():
+    import io
+    from cli import build_parser, run_batch
+    lines = ["1+1", "", "1/0", "2**10", "   ", "x", "3*3"]
+    expected = "2\n\nError: Division by zero\n1024\n\nError: Unsupported expression: Name\n9\n"
+    for jobs in (1, 2):
+        out = io.StringIO()
+        run_batch(iter(lines), out, jobs=jobs, chunk_size=2)
+        assert out.getvalue() == expected, jobs
+    for bad in (["--chunk-size", "0"], ["--jobs", "-1"]):
+        try:
+            build_parser().parse_args(bad)
+            assert False, "Expected SystemExit"
+        except SystemExit as e:
+            assert e.code == 2
@@ -0,0 +1,86 @@
+"""
+Thin client for todo.py's server mode.
+
+While `todo.py serve` runs, every other todo.py command is forwarded to it
+over a Unix socket (default: <data file>.sock). todo.py calls forward()
+before importing anything else, and this module only needs json, os,
+socket and sys, so a forwarded command costs little more than starting the
+interpreter.
+
+Protocol: one JSON line {"argv": [...], "cwd": "...", "stdin": n} followed
+by n bytes of the client's stdin (only sent for `import -`); the reply is
+one JSON line {"out": "...", "err": "...", "code": n}.
+"""
+import json
+import os
+import socket
+import sys
+
+DEFAULT_FILE = "tasks.json"
+
+
+def socket_path(data, explicit=None):
+    return explicit or os.environ.get("TODO_SOCKET") or data + ".sock"
+
+
+def scan_argv(argv):
+    """(socket path, subcommand, the subcommand's arguments), without argparse."""
+    opts = {"--data": DEFAULT_FILE, "--socket": None}
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        name, eq, value = argv[i].partition("=")
+        if name in opts:
+            if not eq:
+                i += 1
+                value = argv[i] if i < len(argv) else ""
+            opts[name] = value
+        i += 1
+    cmd = argv[i] if i < len(argv) else None
+    return socket_path(opts["--data"], opts["--socket"]), cmd, argv[i + 1:]
+
+
+def connect(path):
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        return None
+    return conn
+
+
+def run_client(path, argv, send_stdin=False):
+    """Run a command on a server; returns its exit code, or None if none is listening."""
+    conn = connect(path)
+    if conn is None:
+        return None
+    with conn:
+        # Read only once connected: with no server, the command runs locally
+        stdin = sys.stdin.buffer.read() if send_stdin else b""
+        request = {"argv": argv, "cwd": os.getcwd(), "stdin": len(stdin)}
+        conn.sendall((json.dumps(request) + "\n").encode("utf-8") + stdin)
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    if not chunks:
+        print(f"The server on {path} closed the connection without replying.",
+              file=sys.stderr)
+        return 1
+    reply = json.loads(b"".join(chunks))
+    sys.stdout.write(reply["out"])
+    sys.stderr.write(reply["err"])
+    return reply["code"]
+
+
+def forward(argv):
+    """Hand argv to a running server; returns its exit code, or None to run locally."""
+    path, cmd, rest = scan_argv(argv)
+    if cmd == "serve" or not os.path.exists(path):
+        return None
+    # `import -` reads stdin, which the server can't see: send it along
+    return run_client(path, argv, send_stdin=cmd == "import" and "-" in rest)
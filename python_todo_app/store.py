@@ -0,0 +1,480 @@
+"""
+Storage engine for todo.py.
+
+Tasks live in two files:
+  tasks.json      snapshot: the tasks as columns, one JSON array per field
+                    {"format": "todo-columns/1", "id": [...], "title": [...],
+                     "done": [...], "created_at": [...], "due": [...],
+                     "priority": [...]}
+                  due dates are day ordinals (0 = none). A plain JSON list
+                  of task objects (the original format) is still read.
+  tasks.json.log  append-only mutation log, one JSON object per line:
+                    {"op": "put", "task": {...}}   add or replace a task
+                    {"op": "del", "id": 3}         delete a task
+
+Opening a store reads the snapshot and replays the log. Tasks are kept in
+memory as id-sorted columns (array/bytearray for the small-int fields, lists
+for the strings), so a million tasks cost a few dozen bytes each plus their
+titles, and list filters scan the numeric columns without touching the
+rest. A Task object is only built for a row a command actually reads. A
+single add/done/edit/delete appends one short line to the log instead of
+rewriting every task. Once the log grows past COMPACT_MIN_OPS entries and
+half the number of live tasks, it is compacted: the snapshot is rewritten
+and the log truncated. Log entries are idempotent, so a crash between those
+two steps loses nothing. All writes go through the shared durable module
+(atomic snapshot replace, fsync'd log appends), so wrapping many mutations
+in durable.group_commit() flushes them together.
+
+A path ending in .db (or .sqlite/.sqlite3) opens a SQLiteTaskStore instead:
+due dates are stored as integer day ordinals with indexes on (done, due)
+and priority, so list filters are indexed range queries. open_store() picks
+the right class; migrate() copies tasks between any two stores.
+"""
+import heapq
+import json
+import os
+import sqlite3
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date
+from functools import lru_cache
+from itertools import compress, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import durable
+except ImportError:  # durable.py is shared with the other apps, one level up
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import durable
+
+COMPACT_MIN_OPS = 1000
+SNAPSHOT_FORMAT = "todo-columns/1"
+# query() orders: "due" puts tasks without a due date last; ties go by id
+SORT_ORDERS = ("id", "due", "priority")
+_NO_DUE = date.max.toordinal() + 1
+
+def _check_page(sort: str, limit: Optional[int], offset: int) -> None:
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"unknown sort order {sort!r}; expected one of {SORT_ORDERS}")
+    if (limit is not None and limit < 0) or offset < 0:
+        raise ValueError("limit and offset must be >= 0")
+
+@lru_cache(maxsize=4096)
+def date_to_ordinal(s: str) -> int:
+    return date.fromisoformat(s).toordinal()
+
+@lru_cache(maxsize=4096)
+def ordinal_to_date(n: int) -> str:
+    return date.fromordinal(n).isoformat()
+
+class Task:
+    """
+    One task. due is a day ordinal (date.toordinal()) or None; done is a
+    bool and priority 1 (high) to 3 (low). Tasks handed out by a store are
+    copies: change one and pass it to store.update().
+    """
+    __slots__ = ("id", "title", "done", "created_at", "due", "priority")
+
+    def __init__(self, id: int, title: str, done: bool = False,
+                 created_at: Optional[str] = None, due: Optional[int] = None,
+                 priority: int = 2):
+        self.id = id
+        self.title = title
+        self.done = done
+        self.created_at = created_at
+        self.due = due
+        self.priority = priority
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Task":
+        due = d.get("due")
+        return cls(d["id"], d["title"], bool(d.get("done")), d.get("created_at"),
+                   date_to_ordinal(due) if due else None, d.get("priority", 2))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "title": self.title, "done": self.done,
+                "created_at": self.created_at, "due": self.due_str, "priority": self.priority}
+
+    @property
+    def due_str(self) -> Optional[str]:
+        return ordinal_to_date(self.due) if self.due else None
+
+    def is_overdue(self, today: int) -> bool:
+        return not self.done and self.due is not None and self.due < today
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Task):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self) -> str:
+        return "Task(" + ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__) + ")"
+
+def load_snapshot(path: str) -> Any:
+    """Read a snapshot file: a columns dict, or a legacy list of task dicts."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return []
+
+def save_snapshot(path: str, columns: Dict[str, list]) -> None:
+    """Atomically write a snapshot file from a columns dict."""
+    durable.write_json(path, {"format": SNAPSHOT_FORMAT, **columns}, separators=(",", ":"))
+
+_NOT_DONE = bytes([1, 0]) + bytes(254)  # bytes.translate table: done flag -> "open" flag
+
+class TaskStore:
+    """Tasks in id order, held as columns and persisted as snapshot + append-only log."""
+
+    def __init__(self, path: str, compact_min_ops: int = COMPACT_MIN_OPS):
+        self.path = path
+        self.log_path = path + ".log"
+        self.compact_min_ops = compact_min_ops
+        self._set_columns([], [], [], [], [], [])
+        self._max_id = 0
+        self._log_ops = 0
+        snapshot = load_snapshot(path)
+        if isinstance(snapshot, dict):
+            # Numeric columns convert in bulk; strings are used as parsed
+            self._set_columns(snapshot["id"], snapshot["title"], snapshot["done"],
+                              snapshot["created_at"], snapshot["due"], snapshot["priority"])
+            self._max_id = self._ids[-1] if self._ids else 0
+        else:
+            for d in snapshot:
+                self._put(Task.from_dict(d))
+        self._replay()
+
+    def _set_columns(self, ids, titles, done, created, due, priority) -> None:
+        self._ids = array("q", ids)
+        self._titles: List[str] = list(titles)
+        self._done = bytearray(done)
+        self._created: List[Optional[str]] = list(created)
+        self._due = array("l", due)  # 0 = no due date
+        self._priority = bytearray(priority)
+
+    def _columns(self) -> Dict[str, list]:
+        return {"id": self._ids.tolist(), "title": self._titles, "done": list(self._done),
+                "created_at": self._created, "due": self._due.tolist(),
+                "priority": list(self._priority)}
+
+    # -- reading -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[Task]:
+        return (self._row(i) for i in range(len(self._ids)))
+
+    def get(self, task_id: int) -> Optional[Task]:
+        i = self._index(task_id)
+        return None if i is None else self._row(i)
+
+    def next_id(self) -> int:
+        return self._max_id + 1
+
+    def query(self, include_done: bool = False, overdue_before: Optional[int] = None,
+              priority: Optional[int] = None, sort: str = "id",
+              limit: Optional[int] = None, offset: int = 0) -> Iterator[Task]:
+        """
+        Tasks matching the list filters, in sort order (see SORT_ORDERS),
+        skipping offset and stopping after limit. overdue_before is a day
+        ordinal: only open tasks due before it are returned.
+
+        Rows are produced lazily. In id order a page stops scanning once it
+        is full; other orders keep only the best offset+limit rows in a heap.
+        """
+        _check_page(sort, limit, offset)
+        rows: Iterable[int] = range(len(self._ids))
+        if overdue_before or not include_done:
+            rows = compress(rows, self._done.translate(_NOT_DONE))
+        if overdue_before:
+            due = self._due
+            rows = (i for i in rows if 0 < due[i] < overdue_before)
+        if priority is not None:
+            prio = self._priority
+            rows = (i for i in rows if prio[i] == priority)
+        if sort != "id":
+            # Row index order is id order, so i breaks ties by id
+            due, prio = self._due, self._priority
+            if sort == "due":
+                key = lambda i: (due[i] or _NO_DUE, i)
+            else:
+                key = lambda i: (prio[i], due[i] or _NO_DUE, i)
+            if limit is None:
+                rows = sorted(rows, key=key)
+            else:
+                rows = heapq.nsmallest(offset + limit, rows, key=key)
+        stop = None if limit is None else offset + limit
+        return map(self._row, islice(rows, offset, stop))
+
+    # -- writing -----------------------------------------------------------
+
+    def add(self, task: Task) -> None:
+        self._put(task)
+        self._append({"op": "put", "task": task.to_dict()})
+
+    def add_many(self, tasks: Iterable[Task]) -> int:
+        """
+        Add many tasks and write them with a single compaction. All or
+        nothing: if tasks raises part way, the ones already put are undone.
+        """
+        undo, max_id = [], self._max_id
+        try:
+            for t in tasks:
+                undo.append((t.id, self.get(t.id)))
+                self._put(t)
+        except BaseException:
+            for task_id, old in reversed(undo):
+                if old is None:
+                    self._remove(task_id)
+                else:
+                    self._put(old)
+            self._max_id = max_id
+            raise
+        if undo:
+            self.compact()
+        return len(undo)
+
+    def update(self, task: Task) -> None:
+        """Persist changes made to a task returned by get()."""
+        self._put(task)
+        self._append({"op": "put", "task": task.to_dict()})
+
+    def delete(self, task_id: int) -> bool:
+        if not self._remove(task_id):
+            return False
+        self._append({"op": "del", "id": task_id})
+        return True
+
+    def clear_completed(self) -> int:
+        """Drop all completed tasks; returns how many were removed."""
+        keep = self._done.translate(_NOT_DONE)
+        removed = len(self._ids) - keep.count(1)
+        if removed:
+            self._set_columns(*(compress(col, keep) for col in (
+                self._ids, self._titles, self._done, self._created, self._due, self._priority)))
+            self.compact()
+        return removed
+
+    def compact(self) -> None:
+        """Rewrite the snapshot from memory and empty the log."""
+        save_snapshot(self.path, self._columns())
+        durable.remove(self.log_path)
+        self._log_ops = 0
+
+    def flush(self) -> None:
+        """Write out log entries deferred by durable.group_commit()."""
+        durable.flush()
+
+    def close(self) -> None:
+        pass  # every change is already on disk (or pending in a group commit)
+
+    # -- internals ---------------------------------------------------------
+
+    def _index(self, task_id: int) -> Optional[int]:
+        i = bisect_left(self._ids, task_id)
+        return i if i < len(self._ids) and self._ids[i] == task_id else None
+
+    def _row(self, i: int) -> Task:
+        return Task(self._ids[i], self._titles[i], bool(self._done[i]), self._created[i],
+                    self._due[i] or None, self._priority[i])
+
+    def _put(self, t: Task) -> None:
+        ids = self._ids
+        if ids and t.id <= ids[-1]:
+            i = bisect_left(ids, t.id)
+            if ids[i] == t.id:
+                self._titles[i] = t.title
+                self._done[i] = bool(t.done)
+                self._created[i] = t.created_at
+                self._due[i] = t.due or 0
+                self._priority[i] = t.priority
+                return
+        else:
+            i = len(ids)  # new ids are normally the largest: plain appends
+        ids.insert(i, t.id)
+        self._titles.insert(i, t.title)
+        self._done.insert(i, bool(t.done))
+        self._created.insert(i, t.created_at)
+        self._due.insert(i, t.due or 0)
+        self._priority.insert(i, t.priority)
+        if t.id > self._max_id:
+            self._max_id = t.id
+
+    def _remove(self, task_id: int) -> bool:
+        i = self._index(task_id)
+        if i is None:
+            return False
+        for col in (self._ids, self._titles, self._done, self._created, self._due, self._priority):
+            del col[i]
+        return True
+
+    def _replay(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write from a crash; later lines still apply
+                if entry.get("op") == "put":
+                    self._put(Task.from_dict(entry["task"]))
+                elif entry.get("op") == "del":
+                    self._remove(entry["id"])
+                self._log_ops += 1
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        durable.append_lines(self.log_path, [json.dumps(entry, separators=(",", ":")) + "\n"])
+        self._log_ops += 1
+        if self._log_ops >= max(self.compact_min_ops, len(self._ids) // 2):
+            self.compact()
+
+class SQLiteTaskStore:
+    """Same interface as TaskStore, backed by an indexed SQLite database."""
+
+    _COLUMNS = "id, title, done, created_at, due, priority"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT,
+                due INTEGER,
+                priority INTEGER NOT NULL DEFAULT 2
+            );
+            CREATE INDEX IF NOT EXISTS tasks_done_due ON tasks (done, due);
+            CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority);
+        """)
+
+    @staticmethod
+    def _row(row) -> Task:
+        return Task(row[0], row[1], bool(row[2]), row[3], row[4], row[5])
+
+    @staticmethod
+    def _params(t: Task):
+        return (t.id, t.title, int(bool(t.done)), t.created_at, t.due, t.priority)
+
+    # -- reading -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def __iter__(self) -> Iterator[Task]:
+        cur = self.conn.execute(f"SELECT {self._COLUMNS} FROM tasks ORDER BY id")
+        return (self._row(r) for r in cur)
+
+    def get(self, task_id: int) -> Optional[Task]:
+        row = self.conn.execute(
+            f"SELECT {self._COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return None if row is None else self._row(row)
+
+    def next_id(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM tasks").fetchone()[0]
+
+    _ORDER_BY = {
+        "id": "id",
+        "due": "due IS NULL, due, id",
+        "priority": "priority, due IS NULL, due, id",
+    }
+
+    def query(self, include_done: bool = False, overdue_before: Optional[int] = None,
+              priority: Optional[int] = None, sort: str = "id",
+              limit: Optional[int] = None, offset: int = 0) -> Iterator[Task]:
+        _check_page(sort, limit, offset)
+        where, params = [], []
+        if overdue_before:
+            # Range scan on the (done, due) index
+            where.append("done = 0 AND due < ?")
+            params.append(overdue_before)
+        elif not include_done:
+            where.append("done = 0")
+        if priority is not None:
+            where.append("priority = ?")
+            params.append(priority)
+        sql = f"SELECT {self._COLUMNS} FROM tasks"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + self._ORDER_BY[sort]
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        cur = self.conn.execute(sql, params)
+        return (self._row(r) for r in cur)
+
+    # -- writing -----------------------------------------------------------
+    # Changes are committed by close(), so one CLI command is one transaction.
+
+    def add(self, task: Task) -> None:
+        self.conn.execute(f"INSERT INTO tasks ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                          self._params(task))
+
+    def add_many(self, tasks: Iterable[Task]) -> int:
+        """All or nothing, like TaskStore.add_many(), via a savepoint."""
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        self.conn.execute("SAVEPOINT add_many")
+        try:
+            cur = self.conn.executemany(
+                f"INSERT INTO tasks ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._params(t) for t in tasks))
+        except BaseException:
+            # Only this batch: earlier uncommitted changes (serve mode) stay
+            self.conn.execute("ROLLBACK TO add_many")
+            self.conn.execute("RELEASE add_many")
+            raise
+        self.conn.execute("RELEASE add_many")
+        return cur.rowcount
+
+    def update(self, task: Task) -> None:
+        p = self._params(task)
+        self.conn.execute(
+            "UPDATE tasks SET title = ?, done = ?, created_at = ?, due = ?, priority = ? "
+            "WHERE id = ?", p[1:] + p[:1])
+
+    def delete(self, task_id: int) -> bool:
+        return self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount > 0
+
+    def clear_completed(self) -> int:
+        return self.conn.execute("DELETE FROM tasks WHERE done = 1").rowcount
+
+    def compact(self) -> None:
+        self.conn.commit()
+        self.conn.execute("VACUUM")
+
+    def flush(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+def open_store(path: str):
+    """Open a SQLiteTaskStore for .db/.sqlite paths, else a JSON TaskStore."""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        return SQLiteTaskStore(path)
+    return TaskStore(path)
+
+def migrate(src_path: str, dst) -> int:
+    """
+    Copy every task from the store at src_path into dst in one batch.
+    dst must be empty: copied tasks keep their ids, which would clash with
+    (or silently replace) tasks already there.
+    """
+    if len(dst):
+        raise ValueError(f"destination already has {len(dst)} task(s); migrate into an empty store")
+    src = open_store(src_path)
+    try:
+        return dst.add_many(iter(src))
+    finally:
+        src.close()
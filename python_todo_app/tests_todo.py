@@ -0,0 +1,165 @@
+# tests_todo.py
+from store import Task, TaskStore
+import durable  # importable once store has put the repo root on sys.path
+
+def add_tasks(s, titles):
+    for title in titles:
+        s.add(Task(s.next_id(), title))
+
+def test_group_commit_keeps_disk_consistent(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    s = TaskStore(path, compact_min_ops=5)
+    add_tasks(s, ["a", "b", "c"])
+    with durable.group_commit():
+        add_tasks(s, ["d", "e", "f", "g"])  # compacts half way through
+        # Nothing is flushed yet: disk still holds the last durable state
+        assert [t.title for t in TaskStore(path)] == ["a", "b", "c"]
+    assert [t.title for t in TaskStore(path)] == ["a", "b", "c", "d", "e", "f", "g"]
+
+def run_import(store, path):
+    from argparse import Namespace
+    import todo
+    todo.cmd_import(Namespace(file=str(path), format=None, progress=0), store)
+
+def test_import_skips_bad_records(tmp_path):
+    from store import open_store
+    src = tmp_path / "in.jsonl"
+    src.write_text('{"title": "a"}\n{"title": \n{"title": ""}\n[1]\n{"title": "b", "due": "2025-02-30"}\n'
+                   '{"title": "c", "priority": 3}\n', encoding="utf-8")
+    for name in ("tasks.json", "tasks.db"):
+        s = open_store(str(tmp_path / name))
+        run_import(s, src)
+        s.close()
+        s = open_store(str(tmp_path / name))
+        assert [(t.id, t.title, t.priority) for t in s] == [(1, "a", 2), (2, "c", 3)]
+        s.close()
+
+def test_import_is_all_or_nothing(tmp_path):
+    from store import open_store
+    src = tmp_path / "in.jsonl"
+    # Enough good lines to be read (and added) before the undecodable byte
+    src.write_bytes(b"".join(b'{"title": "task %d"}\n' % i for i in range(5000)) + b"\xff\n")
+    for name in ("tasks.json", "tasks.db"):
+        s = open_store(str(tmp_path / name))
+        add_tasks(s, ["keep"])
+        try:
+            run_import(s, src)
+            assert False, "Expected UnicodeDecodeError"
+        except UnicodeDecodeError:
+            pass
+        assert [t.title for t in s] == ["keep"] and s.next_id() == 2
+        s.close()
+        s = open_store(str(tmp_path / name))
+        assert [t.title for t in s] == ["keep"]
+        s.close()
+
+def test_scan_argv():
+    from client import scan_argv
+    assert scan_argv(["list"]) == ("tasks.json.sock", "list", [])
+    assert scan_argv(["--data", "w.json", "import", "-"]) == ("w.json.sock", "import", ["-"])
+    assert scan_argv(["--socket=/tmp/s", "--data=w.json", "done", "3"]) == ("/tmp/s", "done", ["3"])
+
+def test_server_forwards_stdin(tmp_path):
+    import os, subprocess, sys, time
+    todo_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "todo.py")
+    env = dict(os.environ, TODO_SOCKET=str(tmp_path / "s.sock"))
+    server = subprocess.Popen([sys.executable, todo_py, "serve"], cwd=tmp_path, env=env)
+    try:
+        for _ in range(200):
+            if os.path.exists(tmp_path / "s.sock"):
+                break
+            time.sleep(0.05)
+        run = subprocess.run([sys.executable, todo_py, "import", "-"], cwd=tmp_path, env=env,
+                             input=b'{"title": "a"}\n{"title": "b"}\n', capture_output=True)
+        assert run.returncode == 0, run.stderr
+        run = subprocess.run([sys.executable, todo_py, "stop"], cwd=tmp_path, env=env)
+        assert run.returncode == 0
+        server.wait(timeout=10)
+    finally:
+        server.kill()
+    s = TaskStore(str(tmp_path / "tasks.json"))
+    assert [t.title for t in s] == ["a", "b"]
+
+def test_store_reopen_replays_log(tmp_path):
+    import os
+    path = str(tmp_path / "tasks.json")
+    s = TaskStore(path)
+    add_tasks(s, ["a", "b", "c"])
+    t = s.get(2)
+    t.done, t.due, t.priority = True, 739000, 1
+    s.update(t)
+    assert s.delete(1) and not s.delete(1)
+    assert not os.path.exists(path) and os.path.exists(path + ".log")  # log only so far
+    r = TaskStore(path)
+    assert list(r) == list(s) and r.get(2) == t and r.next_id() == 4
+    # A torn last line (a crash mid-append) is skipped; earlier entries still apply
+    with open(path + ".log", "a") as f:
+        f.write('{"op":"put","task":{"id":9')
+    assert [x.id for x in TaskStore(path)] == [2, 3]
+
+def test_store_compacts_log_into_snapshot(tmp_path):
+    import json, os
+    path = str(tmp_path / "tasks.json")
+    s = TaskStore(path, compact_min_ops=4)
+    add_tasks(s, ["a", "b", "c"])
+    assert os.path.exists(path + ".log")
+    add_tasks(s, ["d"])  # fourth log entry: snapshot written, log dropped
+    assert not os.path.exists(path + ".log")
+    with open(path) as f:
+        assert json.load(f)["title"] == ["a", "b", "c", "d"]
+    s.delete(2)
+    assert [t.title for t in TaskStore(path)] == ["a", "c", "d"]
+
+def test_store_reads_legacy_list(tmp_path):
+    import json
+    path = tmp_path / "tasks.json"
+    path.write_text(json.dumps([{"id": 1, "title": "old", "done": True},
+                                {"id": 3, "title": "due", "due": "2025-01-31", "priority": 1}]))
+    s = TaskStore(str(path))
+    assert [(t.id, t.done, t.due_str, t.priority) for t in s] == [
+        (1, True, None, 2), (3, False, "2025-01-31", 1)]
+    assert s.next_id() == 4
+    assert [t.id for t in s.query()] == [3]
+
+def test_sqlite_migrate_and_query_match(tmp_path):
+    from store import SQLiteTaskStore, migrate
+    src = TaskStore(str(tmp_path / "tasks.json"))
+    for i in range(1, 41):
+        src.add(Task(i, f"t{i}", done=i % 5 == 0, due=739000 + i % 7 if i % 3 else None,
+                     priority=1 + i % 3))
+    db = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    assert migrate(str(tmp_path / "tasks.json"), db) == 40
+    # A second run, or any non-empty destination, is refused and left as is
+    other = TaskStore(str(tmp_path / "other.json"))
+    other.add(Task(1, "keep me"))
+    for dst in (db, other):
+        before = list(dst)
+        try:
+            migrate(str(tmp_path / "tasks.json"), dst)
+            assert False, "Expected ValueError"
+        except ValueError as e:
+            assert "empty" in str(e)
+        assert list(dst) == before
+    other.close()
+    db.close()
+    db = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    assert list(db) == list(src) and db.next_id() == 41
+    for kwargs in [{}, {"include_done": True}, {"overdue_before": 739004},
+                   {"priority": 2, "sort": "due"}, {"sort": "priority", "limit": 5, "offset": 3},
+                   {"sort": "due", "offset": 30}]:
+        assert list(db.query(**kwargs)) == list(src.query(**kwargs)), kwargs
+    db.close()
+
+def test_export_import_round_trip(tmp_path):
+    from argparse import Namespace
+    import todo
+    src = TaskStore(str(tmp_path / "src.json"))
+    src.add(Task(1, "plain", created_at="2025-01-01T00:00:00"))
+    src.add(Task(2, 'quote " and, comma', done=True, created_at="2025-01-02T03:04:05",
+                 due=739300, priority=1))
+    src.add(Task(3, "ünïcode", created_at="2025-01-03T00:00:00", due=739301, priority=3))
+    for name in ("out.jsonl", "out.csv"):
+        todo.cmd_export(Namespace(file=str(tmp_path / name), format=None, progress=0), src)
+        dst = TaskStore(str(tmp_path / (name + ".json")))
+        run_import(dst, tmp_path / name)
+        assert [t.to_dict() for t in dst] == [t.to_dict() for t in src], name
@@ -1,136 +1,335 @@
 #!/usr/bin/env python3
-import argparse
-import json
-import os
-from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+import sys
 
-DEFAULT_FILE = "tasks.json"
-DATE_FMT = "%Y-%m-%d"
+from client import DEFAULT_FILE, connect, forward, scan_argv, socket_path
 
-def load_tasks(path: str) -> List[Dict[str, Any]]:
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
+if __name__ == "__main__":
+    # With a server running, hand the command over before loading the rest
+    _code = forward(sys.argv[1:])
+    if _code is not None:
+        sys.exit(_code)
 
-def save_tasks(path: str, tasks: List[Dict[str, Any]]) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(tasks, f, indent=2)
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import csv  # noqa: E402
+import io  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import signal  # noqa: E402
+import socket  # noqa: E402
+import time  # noqa: E402
+import traceback  # noqa: E402
+from contextlib import nullcontext, redirect_stderr, redirect_stdout  # noqa: E402
+from datetime import datetime, date  # noqa: E402
+from functools import lru_cache  # noqa: E402
+from typing import Iterable, Iterator, Dict, Any, Optional, Union  # noqa: E402
 
-def next_id(tasks: List[Dict[str, Any]]) -> int:
-    return (max((t["id"] for t in tasks), default=0) + 1)
+from store import SORT_ORDERS, Task, migrate, open_store  # noqa: E402
+import durable  # noqa: E402  (importable once store has set up sys.path)
 
-def parse_date(s: Optional[str]) -> Optional[str]:
+DATE_FMT = "%Y-%m-%d"
+
+@lru_cache(maxsize=4096)
+def parse_date(s: Optional[str]) -> Optional[int]:
+    """Validate a YYYY-MM-DD date; returns its day ordinal (see store.Task)."""
     if not s:
         return None
     try:
-        # Validate and normalize
-        dt = datetime.strptime(s, DATE_FMT).date()
-        return dt.strftime(DATE_FMT)
+        return datetime.strptime(s, DATE_FMT).toordinal()
     except ValueError:
         raise argparse.ArgumentTypeError(f"Invalid date '{s}'. Use YYYY-MM-DD.")
 
+def non_negative(s: str) -> int:
+    n = int(s)
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"expected a number >= 0, got {n}")
+    return n
+
 def prio_str(p: int) -> str:
     return {1:"H", 2:"M", 3:"L"}.get(p, "?")
 
-def is_overdue(task: Dict[str, Any]) -> bool:
-    if not task.get("due"):
-        return False
-    try:
-        due = datetime.strptime(task["due"], DATE_FMT).date()
-        return (not task["done"]) and (due < date.today())
-    except Exception:
-        return False
-
-def fmt_row(t: Dict[str, Any]) -> str:
-    due = t.get("due") or "-"
-    over = "!" if is_overdue(t) else " "
-    status = "✓" if t["done"] else " "
-    return f'{t["id"]:>3}  [{status}]  P{prio_str(t["priority"])}  {due:>10}  {over}  {t["title"]}'
-
-def list_tasks(tasks: List[Dict[str, Any]], include_done=False, only_overdue=False) -> None:
-    rows = []
-    for t in tasks:
-        if only_overdue and not is_overdue(t):
-            continue
-        if not include_done and t["done"]:
-            continue
-        rows.append(fmt_row(t))
-
-    if not rows:
+def today_ordinal() -> int:
+    return date.today().toordinal()
+
+def fmt_row(t: Task, today: Optional[int] = None) -> str:
+    due = t.due_str or "-"
+    over = "!" if t.is_overdue(today_ordinal() if today is None else today) else " "
+    status = "✓" if t.done else " "
+    return f'{t.id:>3}  [{status}]  P{prio_str(t.priority)}  {due:>10}  {over}  {t.title}'
+
+def print_tasks(tasks: Iterable[Task]) -> None:
+    """Format and print rows as they arrive, so output starts right away."""
+    today = today_ordinal()
+    rows = (fmt_row(t, today) for t in tasks)
+    first = next(rows, None)
+
+    if first is None:
         print("(no tasks match)")
         return
 
     print(" ID  [✓]  Pr  Due         !  Title")
     print("---- ---- -- ---------- -- ------------------------------")
+    print(first)
     for r in rows:
         print(r)
 
-def cmd_add(args, tasks, path):
-    t = {
-        "id": next_id(tasks),
-        "title": args.title,
-        "done": False,
-        "created_at": datetime.now().isoformat(timespec="seconds"),
-        "due": parse_date(args.due),
-        "priority": args.priority,
-    }
-    tasks.append(t)
-    save_tasks(path, tasks)
-    print(f"Added #{t['id']}: {t['title']}")
-
-def cmd_list(args, tasks, path):
-    list_tasks(tasks, include_done=args.all, only_overdue=args.overdue)
-
-def cmd_done(args, tasks, path):
-    for t in tasks:
-        if t["id"] == args.id:
-            if t["done"]:
-                print(f"Task #{args.id} already completed.")
-            else:
-                t["done"] = True
-                save_tasks(path, tasks)
-                print(f"Marked #{args.id} as done.")
-            return
-    print(f"Task #{args.id} not found.")
+def cmd_add(args, store):
+    t = Task(store.next_id(), args.title,
+             created_at=datetime.now().isoformat(timespec="seconds"),
+             due=parse_date(args.due), priority=args.priority)
+    store.add(t)
+    print(f"Added #{t.id}: {t.title}")
+
+def cmd_list(args, store):
+    print_tasks(store.query(include_done=args.all,
+                            overdue_before=today_ordinal() if args.overdue else None,
+                            priority=args.priority, sort=args.sort,
+                            limit=args.limit, offset=args.offset))
 
-def cmd_delete(args, tasks, path):
-    before = len(tasks)
-    tasks[:] = [t for t in tasks if t["id"] != args.id]
-    if len(tasks) == before:
+def cmd_done(args, store):
+    t = store.get(args.id)
+    if t is None:
         print(f"Task #{args.id} not found.")
+    elif t.done:
+        print(f"Task #{args.id} already completed.")
     else:
-        save_tasks(path, tasks)
+        t.done = True
+        store.update(t)
+        print(f"Marked #{args.id} as done.")
+
+def cmd_delete(args, store):
+    if store.delete(args.id):
         print(f"Deleted #{args.id}.")
+    else:
+        print(f"Task #{args.id} not found.")
 
-def cmd_edit(args, tasks, path):
-    for t in tasks:
-        if t["id"] == args.id:
-            if args.title:
-                t["title"] = args.title
-            if args.priority:
-                t["priority"] = args.priority
-            if args.due is not None:  # allow clearing with empty string
-                t["due"] = parse_date(args.due) if args.due else None
-            save_tasks(path, tasks)
-            print(f"Updated #{args.id}.")
-            return
-    print(f"Task #{args.id} not found.")
+def cmd_edit(args, store):
+    t = store.get(args.id)
+    if t is None:
+        print(f"Task #{args.id} not found.")
+        return
+    if args.title:
+        t.title = args.title
+    if args.priority:
+        t.priority = args.priority
+    if args.due is not None:  # allow clearing with empty string
+        t.due = parse_date(args.due) if args.due else None
+    store.update(t)
+    print(f"Updated #{args.id}.")
 
-def cmd_clear_completed(args, tasks, path):
-    kept = [t for t in tasks if not t["done"]]
-    removed = len(tasks) - len(kept)
-    tasks[:] = kept
-    save_tasks(path, tasks)
+def cmd_clear_completed(args, store):
+    removed = store.clear_completed()
     print(f"Removed {removed} completed task(s).")
 
+def cmd_migrate(args, store):
+    try:
+        copied = migrate(args.source, store)
+    except ValueError as e:
+        print(f"Cannot migrate into {args.data}: {e}.")
+        return
+    print(f"Migrated {copied} task(s) from {args.source} to {args.data}.")
+
+# ---------------------------------------------------------------------------
+# Bulk import / export (JSON Lines or CSV, streamed)
+# ---------------------------------------------------------------------------
+EXPORT_FIELDS = ["id", "title", "done", "created_at", "due", "priority"]
+
+def guess_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+def read_records(f, fmt: str) -> Iterator[Union[Dict[str, Any], str]]:
+    """CSV rows as dicts; JSON Lines as raw lines, decoded by task_from_record."""
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+    for line in f:
+        if line.strip():
+            yield line
+
+def _truthy(v) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in {"1", "true", "yes", "y", "x", "✓"}
+    return bool(v)
+
+def task_from_record(rec: Union[Dict[str, Any], str], task_id: int, now: str) -> Task:
+    """Validate an imported record (a dict or a JSON line); its own id (if any) is ignored."""
+    if isinstance(rec, str):
+        rec = json.loads(rec)  # a malformed line is a ValueError like any bad field
+    title = (rec.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+    priority = int(rec.get("priority") or 2)
+    if priority not in (1, 2, 3):
+        raise ValueError(f"invalid priority {priority}")
+    return Task(task_id, title, _truthy(rec.get("done", False)),
+                rec.get("created_at") or now, parse_date(rec.get("due") or None), priority)
+
+def _report(verb: str, count: int, start: float, final: bool = False) -> None:
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0.0
+    msg = f"{verb} {count} task(s) in {elapsed:.2f}s ({rate:,.0f} tasks/s)"
+    print(msg if final else msg + "...", file=sys.stderr)
+
+def cmd_import(args, store):
+    fmt = args.format or guess_format(args.file)
+    now = datetime.now().isoformat(timespec="seconds")
+    first_id = store.next_id()
+    start = time.perf_counter()
+    counts = {"ok": 0, "bad": 0}
+
+    def tasks():
+        src = nullcontext(sys.stdin) if args.file == "-" else \
+            open(args.file, "r", encoding="utf-8", newline="")
+        with src as f:
+            for n, rec in enumerate(read_records(f, fmt), 1):
+                try:
+                    t = task_from_record(rec, first_id + counts["ok"], now)
+                except (ValueError, TypeError, AttributeError, argparse.ArgumentTypeError) as e:
+                    counts["bad"] += 1
+                    print(f"Skipping record {n}: {e}", file=sys.stderr)
+                    continue
+                counts["ok"] += 1
+                if args.progress and counts["ok"] % args.progress == 0:
+                    _report("Read", counts["ok"], start)
+                yield t
+
+    # One batch: ids are assigned up front and the store is written once;
+    # if reading fails part way, add_many() keeps none of it
+    store.add_many(tasks())
+    _report("Imported", counts["ok"], start, final=True)
+    if counts["bad"]:
+        print(f"Skipped {counts['bad']} invalid record(s).", file=sys.stderr)
+
+def cmd_export(args, store):
+    fmt = args.format or guess_format(args.file)
+    start = time.perf_counter()
+    count = 0
+    dst = nullcontext(sys.stdout) if args.file == "-" else \
+        open(args.file, "w", encoding="utf-8", newline="")
+    with dst as f:
+        if fmt == "csv":
+            w = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+            w.writeheader()
+        for t in store:
+            if fmt == "csv":
+                w.writerow(t.to_dict())
+            else:
+                f.write(json.dumps(t.to_dict(), ensure_ascii=False) + "\n")
+            count += 1
+            if args.progress and count % args.progress == 0:
+                _report("Wrote", count, start)
+    _report("Exported", count, start, final=True)
+
+# ---------------------------------------------------------------------------
+# Daemon mode: keep the store in memory and let commands talk to it
+# ---------------------------------------------------------------------------
+# `todo.py serve` listens on a Unix socket (default: <data file>.sock). While
+# it runs, every other todo.py command finds the socket and becomes a thin
+# client (client.py): it sends its argv and working directory (plus its
+# stdin for `import -`) and prints the reply, so no file is loaded or parsed
+# per command. The server runs commands one at a time against the in-memory
+# store and writes behind: changes are flushed every --flush-interval
+# seconds and on shutdown.
+FLUSH_INTERVAL = 1.0
+
+def _run_request(parser, store, request, data_path: str, stdin_data: bytes = b"") -> Dict[str, Any]:
+    out, err = io.StringIO(), io.StringIO()
+    code = 0
+    cwd, stdin = os.getcwd(), sys.stdin
+    try:
+        # Relative paths (import/export files) are the client's, and so is stdin
+        os.chdir(request.get("cwd") or cwd)
+        sys.stdin = io.TextIOWrapper(io.BytesIO(stdin_data), encoding="utf-8", newline="")
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                args = parser.parse_args(request["argv"])
+                if os.path.abspath(args.data) != data_path:
+                    print(f"This server holds {data_path}; stop it to use another file.",
+                          file=sys.stderr)
+                    code = 2
+                elif args.func is cmd_serve:
+                    print("A server is already running.", file=sys.stderr)
+                    code = 2
+                elif args.func is not cmd_stop:
+                    args.func(args, store)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        os.chdir(cwd)
+        sys.stdin = stdin
+    return {"out": out.getvalue(), "err": err.getvalue(), "code": code}
+
+async def _serve(path: str, store, data_path: str, interval: float) -> None:
+    parser = build_parser()
+    stop = asyncio.Event()
+
+    async def handle(reader, writer):
+        try:
+            request = json.loads(await reader.readline())
+            stdin_data = await reader.readexactly(int(request.get("stdin") or 0))
+            reply = _run_request(parser, store, request, data_path, stdin_data)
+            if scan_argv(request["argv"])[1] == "stop" and reply["code"] == 0:
+                reply["out"] += "Server stopped.\n"
+                stop.set()
+            writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+            await writer.drain()
+        except (ValueError, KeyError, ConnectionError, asyncio.IncompleteReadError):
+            pass  # malformed request or client went away
+        finally:
+            writer.close()
+
+    async def write_behind():
+        while True:
+            await asyncio.sleep(interval)
+            store.flush()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    server = await asyncio.start_unix_server(handle, path)
+    flusher = asyncio.create_task(write_behind())
+    print(f"Serving {data_path} on {path} (Ctrl+C or 'todo.py stop' to quit)")
+    try:
+        await stop.wait()
+    finally:
+        flusher.cancel()
+        server.close()
+        await server.wait_closed()
+
+def cmd_serve(args, store):
+    path = socket_path(args.data, args.socket)
+    if not hasattr(socket, "AF_UNIX"):
+        print("Server mode needs Unix domain sockets, which this platform lacks.")
+        return
+    if os.path.exists(path):
+        conn = connect(path)
+        if conn is not None:
+            conn.close()
+            print(f"A server is already running on {path}.")
+            return
+        os.remove(path)  # stale socket from a crashed server
+    try:
+        with durable.group_commit():  # log appends wait for the next flush
+            asyncio.run(_serve(path, store, os.path.abspath(args.data), args.flush_interval))
+        store.flush()
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+def cmd_stop(args, store):
+    print(f"No server running on {socket_path(args.data, args.socket)}.")
+
 def build_parser() -> argparse.ArgumentParser:
-    p = argparse.ArgumentParser(description="Minimal To‑Do app (JSON storage).")
-    p.add_argument("--data", default=DEFAULT_FILE, help="Path to tasks JSON file (default: tasks.json)")
+    p = argparse.ArgumentParser(description="Minimal To‑Do app (JSON or SQLite storage).")
+    p.add_argument("--data", default=DEFAULT_FILE,
+                   help="Path to tasks file (default: tasks.json); a .db path uses SQLite")
+    p.add_argument("--socket", help="Server socket (default: $TODO_SOCKET or <data>.sock)")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     a = sub.add_parser("add", help="Add a new task")
@@ -142,6 +341,11 @@ def build_parser() -> argparse.ArgumentParser:
     l = sub.add_parser("list", help="List tasks")
     l.add_argument("--all", action="store_true", help="Include completed tasks")
     l.add_argument("--overdue", action="store_true", help="Only overdue tasks")
+    l.add_argument("--priority", type=int, choices=[1,2,3], help="Only tasks with this priority")
+    l.add_argument("--sort", choices=SORT_ORDERS, default="id",
+                   help="Order by id (default), due date (undated last) or priority then due date")
+    l.add_argument("--limit", type=non_negative, help="Show at most this many tasks")
+    l.add_argument("--offset", type=non_negative, default=0, help="Skip this many tasks first")
     l.set_defaults(func=cmd_list)
 
     d = sub.add_parser("done", help="Mark a task done")
@@ -162,13 +366,41 @@ def build_parser() -> argparse.ArgumentParser:
     cc = sub.add_parser("clear-completed", help="Remove all completed tasks")
     cc.set_defaults(func=cmd_clear_completed)
 
+    mg = sub.add_parser("migrate", help="Copy all tasks from another tasks file into --data")
+    mg.add_argument("source", help="Existing tasks file, e.g. tasks.json")
+    mg.set_defaults(func=cmd_migrate)
+
+    for name, func, help_text in (
+        ("import", cmd_import, "Bulk-add tasks from a JSON Lines or CSV file ('-' for stdin)"),
+        ("export", cmd_export, "Write all tasks as JSON Lines or CSV ('-' for stdout)"),
+    ):
+        x = sub.add_parser(name, help=help_text)
+        x.add_argument("file", help="Path, or '-' for stdin/stdout")
+        x.add_argument("--format", choices=["jsonl", "csv"],
+                       help="File format (default: csv for *.csv, else jsonl)")
+        x.add_argument("--progress", type=int, default=100000, metavar="N",
+                       help="Report progress every N tasks (0 = off, default 100000)")
+        x.set_defaults(func=func)
+
+    sv = sub.add_parser("serve", help="Keep tasks in memory and serve other todo.py commands")
+    sv.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL, metavar="SECONDS",
+                    help=f"Write changes to disk this often (default {FLUSH_INTERVAL})")
+    sv.set_defaults(func=cmd_serve)
+
+    st = sub.add_parser("stop", help="Flush and stop a running server")
+    st.set_defaults(func=cmd_stop)
+
     return p
 
 def main():
+    """Run a command locally (commands for a running server are forwarded earlier)."""
     parser = build_parser()
-    args = parser.parse_args()
-    tasks = load_tasks(args.data)
-    args.func(args, tasks, args.data)
+    args = parser.parse_args(sys.argv[1:])
+    store = open_store(args.data)
+    try:
+        args.func(args, store)
+    finally:
+        store.close()
 
 if __name__ == "__main__":
     main()
@@ -1,99 +1,519 @@
+"""
+Multi-user task manager.
+
+Run without arguments for the interactive menu. Everything the menu does
+is also available to scripts:
+
+    users = UserStore()                 # users.db, salted password hashes
+    users.add("alice", "secret")
+    with TaskSession("alice") as tasks: # holds alice's lock, one flush
+        tasks.add("Buy milk, eggs")
+        tasks.set_status(1)
+        print(tasks.tasks())
+
+`python task_manager.py batch FILE` applies a file of commands (see
+run_batch) in one session, and `python task_manager.py convert` converts
+old tasks_<user>.txt files.
+"""
+import argparse
+import glob
+import hashlib
+import hmac
 import os
+import sqlite3
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+
+import durable
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks; version checks still apply
+    fcntl = None
+
+# ---------------- User store ----------------
+# Users live in users.db (SQLite, keyed by username) with salted PBKDF2
+# hashes, so a login is one indexed lookup plus one key derivation. The
+# cost is tunable with TASK_MANAGER_KDF_ITERATIONS; each hash records its
+# own iteration count, and logins rehash passwords made at another cost.
+# An old plaintext users.txt is imported once and then deleted; that pays
+# one key derivation per user (hours for a million users, see
+# benchmarks/bench_task_manager.py), so it commits IMPORT_CHUNK users at a
+# time and an interrupted import picks up where it stopped.
+USERS_DB = "users.db"
+LEGACY_USERS = "users.txt"
+KDF_ITERATIONS = int(os.environ.get("TASK_MANAGER_KDF_ITERATIONS", "200000"))
+IMPORT_CHUNK = 1000
+
+def hash_password(password, iterations=None, salt=None):
+    iterations = iterations or KDF_ITERATIONS
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored):
+    _, iterations, salt, digest = stored.split("$")
+    check = hash_password(password, int(iterations), bytes.fromhex(salt))
+    return hmac.compare_digest(check.rsplit("$", 1)[1], digest)
+
+class UserStore:
+    def __init__(self, path=USERS_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS users ("
+                          "username TEXT PRIMARY KEY, password TEXT NOT NULL) WITHOUT ROWID")
+        self._dummy = None
+        self._batch = 0
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    def __contains__(self, username):
+        return self._hash(username) is not None
+
+    def _hash(self, username):
+        row = self.conn.execute("SELECT password FROM users WHERE username = ?",
+                                (username,)).fetchone()
+        return row and row[0]
+
+    @contextmanager
+    def _write(self):
+        if self._batch:
+            yield
+        else:
+            with self.conn:
+                yield
+
+    @contextmanager
+    def batch(self):
+        """Commit every change made inside the block as one transaction."""
+        self._batch += 1
+        try:
+            yield
+        finally:
+            self._batch -= 1
+            if not self._batch:
+                self.conn.commit()
+
+    def add(self, username, password):
+        """Register a user; False if the name is taken."""
+        try:
+            with self._write():
+                self.conn.execute("INSERT INTO users VALUES (?, ?)",
+                                  (username, hash_password(password)))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def add_hashed(self, users):
+        """Insert (username, password hash) pairs in one transaction; returns how many."""
+        with self._write():
+            return self.conn.executemany("INSERT OR IGNORE INTO users VALUES (?, ?)",
+                                         users).rowcount
+
+    def authenticate(self, username, password):
+        stored = self._hash(username)
+        if stored is None:
+            # Still derive a key, so unknown names take as long as wrong passwords
+            self._dummy = self._dummy or hash_password("")
+            verify_password(password, self._dummy)
+            return False
+        if not verify_password(password, stored):
+            return False
+        if int(stored.split("$")[1]) != KDF_ITERATIONS:
+            with self._write():
+                self.conn.execute("UPDATE users SET password = ? WHERE username = ?",
+                                  (hash_password(password), username))
+        return True
+
+    def import_legacy(self, path=LEGACY_USERS):
+        """
+        Hash the users of a plaintext users.txt, then delete the file.
+        Users already in the database are skipped and every IMPORT_CHUNK
+        users are committed, so running it again after an interruption
+        only hashes the rest; the file is deleted once all are in.
+        """
+        if not os.path.exists(path):
+            return 0
+        added, chunk = 0, {}
+        with open(path, "r") as f:
+            for line in f:
+                if "," not in line:
+                    continue
+                user, pw = line.strip().split(",", 1)
+                # First registration wins, as it did when users.txt was scanned
+                if user in chunk or user in self:
+                    continue
+                chunk[user] = pw
+                if len(chunk) >= IMPORT_CHUNK:
+                    added += self._import_chunk(chunk)
+                    chunk = {}
+        added += self._import_chunk(chunk)
+        os.remove(path)
+        return added
 
-def register_user():
+    def _import_chunk(self, chunk):
+        # Hash before inserting, so the write lock isn't held for the slow part
+        hashed = [(user, hash_password(pw)) for user, pw in chunk.items()]
+        return self.add_hashed(hashed) if hashed else 0
+
+    def close(self):
+        self.conn.close()
+
+def open_users(path=USERS_DB):
+    users = UserStore(path)
+    imported = users.import_legacy()
+    if imported:
+        print(f"Moved {imported} user(s) from {LEGACY_USERS} to {path} with hashed passwords.")
+    return users
+
+def register_user(users):
     print("\n=== User Registration ===")
     username = input("Enter a new username: ")
     password = input("Enter a new password: ")
-    
-    # Check if username already exists
-    if os.path.exists("users.txt"):
-        with open("users.txt", "r") as f:
-            for line in f:
-                stored_user, _ = line.strip().split(",")
-                if stored_user == username:
-                    print("Username already exists. Try again.")
-                    return False
-    
-    # Save new credentials
-    with open("users.txt", "a") as f:
-        f.write(f"{username},{password}\n")
+
+    if not users.add(username, password):
+        print("Username already exists. Try again.")
+        return False
     print("Registration successful!")
     return True
 
-def login_user():
+def login_user(users):
     print("\n=== User Login ===")
     username = input("Enter username: ")
     password = input("Enter password: ")
 
-    if not os.path.exists("users.txt"):
+    if users.is_empty():
         print("No users registered yet. Please register first.")
         return None
 
-    with open("users.txt", "r") as f:
-        for line in f:
-            stored_user, stored_pass = line.strip().split(",")
-            if stored_user == username and stored_pass == password:
-                print("Login successful!")
-                return username
+    if users.authenticate(username, password):
+        print("Login successful!")
+        return username
     print("Login failed. Please try again.")
     return None
 
+# ---------------- Task files ----------------
+# Each user's tasks are in tasks_<user>.dat: a 4-byte magic, then one record
+# per task: a status byte, the description length (uint32, little-endian)
+# and the UTF-8 description. Reading the headers gives an offset index, so
+# marking a task rewrites its status byte in place and deleting one writes
+# a tombstone status; neither rewrites the file. Task numbers count live
+# records only. Once tombstones are half the records, a background thread
+# compacts the file. Old tasks_<user>.txt files are converted on first use
+# (or all at once with `python task_manager.py convert`).
+#
+# Sessions of the same user may run in parallel: writers hold an exclusive
+# advisory lock on tasks_<user>.lock and readers a shared one. The lock file
+# also stores a version number that every delete bumps (the only change
+# that renumbers tasks). Menus remember the version they showed, and a
+# change by task number made against an older version is refused
+# (Conflict) instead of hitting the wrong task.
+MAGIC = b"TMT1"
+_RECORD = struct.Struct("<BI")
+NOT_DONE, DONE, DELETED = 0, 1, 2
+STATUS_NAMES = {NOT_DONE: "not completed", DONE: "completed"}
+COMPACT_MIN_DEAD = 64
+
+class Conflict(Exception):
+    pass
+
 def get_task_file(username):
+    return f"tasks_{username}.dat"
+
+def get_legacy_task_file(username):
     return f"tasks_{username}.txt"
 
+def get_lock_file(username):
+    return f"tasks_{username}.lock"
+
+@contextmanager
+def task_lock(username, exclusive=True):
+    """Lock a user's tasks; yields the lock file, which holds the version."""
+    with open(get_lock_file(username), "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield f
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _version(lock):
+    lock.seek(0)
+    return int(lock.read() or 0)
+
+def _bump_version(lock):
+    version = _version(lock) + 1
+    lock.seek(0)
+    lock.truncate()
+    lock.write(str(version))
+    lock.flush()
+    return version
+
+def _record(status, task):
+    data = task.encode("utf-8")
+    return _RECORD.pack(status, len(data)) + data
+
+def _read(username):
+    try:
+        with open(get_task_file(username), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return MAGIC
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{get_task_file(username)} is not a task file")
+    return data
+
+def _index(data):
+    """
+    Offsets of the live records, the number of tombstones, and where the
+    last complete record ends (a crash can leave a torn record after it).
+    """
+    live, dead = [], 0
+    pos, size = len(MAGIC), len(data)
+    while pos + _RECORD.size <= size:
+        status, length = _RECORD.unpack_from(data, pos)
+        if pos + _RECORD.size + length > size:
+            break
+        if status == DELETED:
+            dead += 1
+        else:
+            live.append(pos)
+        pos += _RECORD.size + length
+    return live, dead, pos
+
+def _decode(data, offset):
+    status, length = _RECORD.unpack_from(data, offset)
+    start = offset + _RECORD.size
+    return data[start:start + length].decode("utf-8"), STATUS_NAMES[status]
+
+def convert_legacy(txt_path, dat_path):
+    """
+    Convert a "task,status" text file; the status is after the last comma.
+    A line without a comma is kept whole as a not completed task.
+    """
+    with open(txt_path, "r") as f:
+        lines = [line.rstrip("\n").rpartition(",") for line in f if line.strip()]
+    records = [_record(DONE, task) if sep and status == "completed"
+               else _record(NOT_DONE, task if sep else status)
+               for task, sep, status in lines]
+    durable.atomic_write(dat_path, MAGIC + b"".join(records))
+    os.remove(txt_path)
+    return len(records)
+
+def _convert_if_needed(username):
+    txt = get_legacy_task_file(username)
+    if os.path.exists(txt):
+        with task_lock(username):
+            if os.path.exists(txt) and not os.path.exists(get_task_file(username)):
+                convert_legacy(txt, get_task_file(username))
+
+def read_tasks(username):
+    """Return (version, [(task, status), ...]) as one consistent snapshot."""
+    _convert_if_needed(username)
+    with task_lock(username, exclusive=False) as lock:
+        data = _read(username)
+        return _version(lock), [_decode(data, off) for off in _index(data)[0]]
+
+def append_task(username, task):
+    """Append a task. Existing task numbers don't move, so no version bump."""
+    _convert_if_needed(username)
+    with task_lock(username):
+        path = get_task_file(username)
+        if not os.path.exists(path):
+            durable.atomic_write(path, MAGIC)
+        end = _index(_read(username))[2]
+        with open(path, "r+b") as f:
+            f.seek(end)
+            f.truncate()  # drop a torn record left by a crash
+            f.write(_record(NOT_DONE, task))
+            f.flush()
+            os.fsync(f.fileno())
+
+def _write_status(username, version, number, status):
+    """Overwrite the status byte of live task `number` (1-based) in place."""
+    _convert_if_needed(username)
+    with task_lock(username) as lock:
+        current = _version(lock)
+        if current != version:
+            raise Conflict(f"tasks of {username} changed (version {version} -> {current})")
+        live, dead, _ = _index(_read(username))
+        if number < 1 or number > len(live):
+            raise IndexError(number)
+        with open(get_task_file(username), "r+b") as f:
+            f.seek(live[number - 1])
+            f.write(bytes([status]))
+            f.flush()
+            os.fsync(f.fileno())
+        if status == DELETED:
+            _bump_version(lock)
+            dead += 1
+    return len(live), dead
+
+def set_status(username, version, number, done=True):
+    """Mark task `number` completed (or not) without rewriting the file."""
+    _write_status(username, version, number, DONE if done else NOT_DONE)
+
+def remove_task(username, version, number):
+    """Tombstone task `number`; compacts in the background once half are dead."""
+    live, dead = _write_status(username, version, number, DELETED)
+    if dead >= COMPACT_MIN_DEAD and dead * 2 >= live:
+        threading.Thread(target=compact_tasks, args=(username,)).start()
+
+def compact_tasks(username):
+    """Rewrite the file without tombstones. Task numbers stay the same."""
+    with task_lock(username):
+        data = _read(username)
+        live, dead, _ = _index(data)
+        if not dead:
+            return
+        records = [data[off:off + _RECORD.size + _RECORD.unpack_from(data, off)[1]]
+                   for off in live]
+        durable.atomic_write(get_task_file(username), MAGIC + b"".join(records))
+
+class TaskSession:
+    """
+    Exclusive access to one user's tasks for a batch of changes. The lock
+    is held until close(); changes apply to an in-memory copy and flush()
+    writes them with one fsync: status changes and deletes as in-place
+    bytes, new tasks as one append.
+    """
+
+    def __init__(self, username):
+        _convert_if_needed(username)
+        self.username = username
+        self._lock_ctx = task_lock(username)
+        self._lock = self._lock_ctx.__enter__()
+        try:
+            self._load()
+        except BaseException:
+            self._lock_ctx.__exit__(*sys.exc_info())
+            raise
+
+    def _load(self):
+        data = _read(self.username)
+        live, self._dead, self._end = _index(data)
+        # [offset or None if not yet written, status, text] per live task
+        self._tasks = [[off, data[off], _decode(data, off)[0]] for off in live]
+        self._changed = {}
+        self._renumbered = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tasks(self):
+        return [(text, STATUS_NAMES[status]) for _, status, text in self._tasks]
+
+    def _entry(self, number):
+        if number < 1 or number > len(self._tasks):
+            raise IndexError(number)
+        return self._tasks[number - 1]
+
+    def add(self, task):
+        self._tasks.append([None, NOT_DONE, task])
+        return len(self._tasks)
+
+    def set_status(self, number, done=True):
+        entry = self._entry(number)
+        entry[1] = DONE if done else NOT_DONE
+        if entry[0] is not None:
+            self._changed[entry[0]] = entry[1]
+
+    def remove(self, number):
+        offset = self._entry(number)[0]
+        del self._tasks[number - 1]
+        if offset is not None:
+            self._changed[offset] = DELETED
+            self._dead += 1
+        self._renumbered = True
+
+    def flush(self):
+        new = [e for e in self._tasks if e[0] is None]
+        if not (self._changed or new):
+            return
+        path = get_task_file(self.username)
+        if not os.path.exists(path):
+            durable.atomic_write(path, MAGIC)
+        with open(path, "r+b") as f:
+            for offset, status in self._changed.items():
+                f.seek(offset)
+                f.write(bytes([status]))
+            f.seek(self._end)
+            f.truncate()
+            records = []
+            for entry in new:
+                entry[0] = self._end
+                records.append(_record(entry[1], entry[2]))
+                self._end += len(records[-1])
+            f.write(b"".join(records))
+            f.flush()
+            os.fsync(f.fileno())
+        self._changed.clear()
+        if self._renumbered:
+            _bump_version(self._lock)
+            self._renumbered = False
+
+    def close(self):
+        """Flush, compact if half the records are tombstones, and unlock."""
+        if self._lock_ctx is None:
+            return
+        try:
+            self.flush()
+            if self._dead >= COMPACT_MIN_DEAD and self._dead * 2 >= len(self._tasks):
+                durable.atomic_write(get_task_file(self.username), MAGIC + b"".join(
+                    _record(status, text) for _, status, text in self._tasks))
+        finally:
+            self._lock_ctx.__exit__(None, None, None)
+            self._lock_ctx = None
+
 def add_task(username):
     print("\n=== Add Task ===")
     task = input("Enter task description: ")
-    with open(get_task_file(username), "a") as f:
-        f.write(f"{task},not completed\n")
+    append_task(username, task)
     print("Task added!")
 
 def view_tasks(username):
+    """Print the tasks; returns the version that was shown."""
     print("\n=== Your Tasks ===")
-    try:
-        with open(get_task_file(username), "r") as f:
-            tasks = f.readlines()
-            if not tasks:
-                print("No tasks yet.")
-                return
-            for i, line in enumerate(tasks, 1):
-                task, status = line.strip().split(",")
-                print(f"{i}. {task} - {status}")
-    except FileNotFoundError:
-        print("No tasks found. Add some!")
+    version, tasks = read_tasks(username)
+    if not tasks:
+        print("No tasks yet. Add some!")
+        return version
+    for i, (task, status) in enumerate(tasks, 1):
+        print(f"{i}. {task} - {status}")
+    return version
 
-def mark_task_complete(username):
-    view_tasks(username)
+def _change_task(username, prompt, change, done_msg):
+    version = view_tasks(username)
     try:
-        task_num = int(input("Enter task number to mark as completed: "))
-        with open(get_task_file(username), "r") as f:
-            tasks = f.readlines()
-        if task_num < 1 or task_num > len(tasks):
-            print("Invalid task number.")
-            return
-        task, _ = tasks[task_num - 1].strip().split(",")
-        tasks[task_num - 1] = f"{task},completed\n"
-        with open(get_task_file(username), "w") as f:
-            f.writelines(tasks)
-        print("Task marked as completed!")
+        task_num = int(input(prompt))
     except ValueError:
         print("Please enter a valid number.")
+        return
 
-def delete_task(username):
-    view_tasks(username)
     try:
-        task_num = int(input("Enter task number to delete: "))
-        with open(get_task_file(username), "r") as f:
-            tasks = f.readlines()
-        if task_num < 1 or task_num > len(tasks):
-            print("Invalid task number.")
-            return
-        del tasks[task_num - 1]
-        with open(get_task_file(username), "w") as f:
-            f.writelines(tasks)
-        print("Task deleted!")
-    except ValueError:
-        print("Please enter a valid number.")
+        change(username, version, task_num)
+    except IndexError:
+        print("Invalid task number.")
+    except Conflict:
+        print("Your tasks were changed in another session. Please try again.")
+    else:
+        print(done_msg)
+
+def mark_task_complete(username):
+    _change_task(username, "Enter task number to mark as completed: ", set_status,
+                 "Task marked as completed!")
+
+def delete_task(username):
+    _change_task(username, "Enter task number to delete: ", remove_task, "Task deleted!")
 
 def task_menu(username):
     while True:
@@ -120,6 +540,7 @@ def task_menu(username):
             print("Invalid option. Try again.")
 
 def main():
+    users = open_users()
     while True:
         print("\n=== Welcome to the Task Manager ===")
         print("1. Register")
@@ -128,9 +549,9 @@ def main():
         choice = input("Select an option: ")
 
         if choice == "1":
-            register_user()
+            register_user(users)
         elif choice == "2":
-            username = login_user()
+            username = login_user(users)
             if username:
                 task_menu(username)
         elif choice == "3":
@@ -138,6 +559,118 @@ def main():
             break
         else:
             print("Invalid choice. Try again.")
+    users.close()
+
+# ---------------- Batch mode ----------------
+def run_batch(lines, users, out=sys.stdout, err=sys.stderr):
+    """
+    Apply commands, one per line; returns the number of failed lines.
+
+        register USER PASSWORD   create a user and make it current
+        login USER PASSWORD      make an existing user current
+        add TEXT                 add a task (TEXT is the rest of the line)
+        complete N / delete N    by task number, as shown by list
+        list                     print the current user's tasks
+
+    Blank lines and lines starting with # are skipped. The current user's
+    tasks stay locked in a TaskSession until another user becomes current,
+    so a batch holds one task lock at a time and batches that switch
+    between the same users in different orders can't deadlock. Each
+    register commits on its own, so users.db isn't held locked for the
+    whole batch either. A failed register or login leaves no user current.
+    """
+    current, failed = None, 0
+    try:
+        for n, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            command, _, rest = line.partition(" ")
+            rest = rest.strip()
+            try:
+                if command in ("register", "login"):
+                    username, _, password = rest.partition(" ")
+                    if not username:
+                        raise ValueError(f"usage: {command} USER PASSWORD")
+                    if command == "register" and not users.add(username, password):
+                        raise ValueError(f"username {username!r} already exists")
+                    if command == "login" and not users.authenticate(username, password):
+                        raise ValueError(f"login failed for {username!r}")
+                    if current is None or current.username != username:
+                        if current is not None:
+                            # Unlock before waiting for the next user's lock
+                            current, previous = None, current
+                            previous.close()
+                        current = TaskSession(username)
+                    continue
+                if current is None:
+                    raise ValueError("register or login first")
+                if command == "add":
+                    if not rest:
+                        raise ValueError("usage: add TEXT")
+                    current.add(rest)
+                elif command in ("complete", "delete"):
+                    number = int(rest)
+                    if command == "complete":
+                        current.set_status(number)
+                    else:
+                        current.remove(number)
+                elif command == "list":
+                    for i, (task, status) in enumerate(current.tasks(), 1):
+                        print(f"{i}. {task} - {status}", file=out)
+                else:
+                    raise ValueError(f"unknown command {command!r}")
+            except IndexError:
+                failed += 1
+                print(f"line {n}: no task {rest}", file=err)
+            except (ValueError, sqlite3.OperationalError) as e:
+                # OperationalError: users.db stayed locked by another process
+                failed += 1
+                print(f"line {n}: {e}", file=err)
+                if command in ("register", "login") and current is not None:
+                    # Don't let the next lines change the previous user's tasks
+                    current, previous = None, current
+                    previous.close()
+    finally:
+        if current is not None:
+            current.close()
+    return failed
+
+def convert_all():
+    """Convert every legacy tasks_*.txt in the current directory."""
+    for txt in sorted(glob.glob("tasks_*.txt")):
+        username = txt[len("tasks_"):-len(".txt")]
+        with task_lock(username):
+            if os.path.exists(get_task_file(username)):
+                print(f"Skipping {txt}: {get_task_file(username)} already exists.")
+                continue
+            count = convert_legacy(txt, get_task_file(username))
+        print(f"Converted {txt}: {count} task(s).")
+
+def cli(argv=None):
+    p = argparse.ArgumentParser(description="Multi-user task manager "
+                                            "(interactive menu when run without a command)")
+    sub = p.add_subparsers(dest="command")
+    b = sub.add_parser("batch", help="Apply a file of commands (see run_batch)")
+    b.add_argument("file", help="Command file, or - for stdin")
+    sub.add_parser("convert", help="Convert legacy tasks_*.txt files")
+    args = p.parse_args(argv)
+
+    if args.command == "convert":
+        convert_all()
+    elif args.command == "batch":
+        users = open_users()
+        try:
+            if args.file == "-":
+                failed = run_batch(sys.stdin, users)
+            else:
+                with open(args.file, "r", encoding="utf-8") as f:
+                    failed = run_batch(f, users)
+        finally:
+            users.close()
+        sys.exit(1 if failed else 0)
+    else:
+        main()
 
 if __name__ == "__main__":
-    main()
+    cli()
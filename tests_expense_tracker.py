@@ -0,0 +1,196 @@
+# tests_expense_tracker.py
+from expense_import import Importer
+from expense_store import ExpenseStore
+
+JAN = "Date,Amount,Description,Category\n01/05/2024,3.50,Coffee,Food\n01/05/2024,3.50,Coffee,Food\n" \
+      "01/09/2024,(12.00),Refund,Misc\n"
+
+def import_all(store, *paths):
+    importer = Importer(store)
+    results = [importer.read(str(p)) for p in paths]
+    importer.commit()
+    return [(r.added, r.duplicates) for r in results]
+
+def test_import_dedupes_across_files_and_runs(tmp_path):
+    for name in ("jan.csv", "jan_copy.csv"):
+        (tmp_path / name).write_text(JAN, encoding="utf-8")
+    store = ExpenseStore()
+    # The copy matches what jan.csv added, coffees counted per file
+    assert import_all(store, tmp_path / "jan.csv", tmp_path / "jan_copy.csv") == [(3, 0), (0, 3)]
+    assert len(store) == 3
+    assert import_all(store, tmp_path / "jan.csv", tmp_path / "jan_copy.csv") == [(0, 3), (0, 3)]
+    assert len(store) == 3
+    # A third coffee that day is new
+    (tmp_path / "more.csv").write_text(JAN + "01/05/2024,3.50,Coffee,Food\n", encoding="utf-8")
+    assert import_all(store, tmp_path / "more.csv") == [(1, 3)]
+    assert store.index.spent_between("01-05-2024", "01-05-2024", "Food") == 10.5
+
+def test_failed_file_adds_nothing(tmp_path):
+    good = "".join(f"01/{1 + i % 28:02d}/2024,{i}.25,row {i},Food\n" for i in range(2000))
+    (tmp_path / "bad.csv").write_bytes(("Date,Amount,Description,Category\n" + good).encode()
+                                       + b"02/01/2024,1.00,caf\xe9,Food\n")
+    (tmp_path / "jan.csv").write_text(JAN, encoding="utf-8")
+    store = ExpenseStore()
+    importer = Importer(store)
+    try:
+        importer.read(str(tmp_path / "bad.csv"))
+        assert False, "Expected UnicodeDecodeError"
+    except UnicodeDecodeError:
+        pass
+    assert len(importer.pending) == 0
+    assert importer.read(str(tmp_path / "jan.csv")).added == 3
+    importer.commit()
+    assert len(store) == 3
+
+def test_non_finite_amounts_are_bad_rows(tmp_path):
+    (tmp_path / "odd.csv").write_text("Date,Amount\n01/02/2024,nan\n01/02/2024,-inf\n"
+                                      "01/02/2024,(Infinity)\n01/02/2024,1e999\n01/03/2024,5\n")
+    store = ExpenseStore()
+    importer = Importer(store)
+    result = importer.read(str(tmp_path / "odd.csv"))
+    assert (result.added, [line for line, _ in result.errors]) == (1, [2, 3, 4, 5])
+    importer.commit()
+    assert store.to_dicts() == [{"date": "01-03-2024", "category": "Uncategorized",
+                                 "amount": 5.0, "description": ""}]
+
+EXPENSES = [
+    {"date": "01-05-2024", "category": "Food", "amount": 3.5, "description": "Coffee"},
+    {"date": "12-31-2023", "category": "Rent", "amount": 1200.0, "description": ""},
+    {"date": "02-29-2024", "category": "Food", "amount": -2.25, "description": 'a "quote"\nand ünï'},
+]
+
+def test_snapshot_and_journal_round_trip(tmp_path, monkeypatch):
+    import expense_store
+    monkeypatch.setattr(expense_store, "SNAPSHOT_CHUNK", 2)  # descriptions over two lines
+    store = ExpenseStore.from_dicts(EXPENSES)
+    path, journal = str(tmp_path / "expenses.snapshot"), str(tmp_path / "expenses.jsonl")
+    expense_store.write_snapshot(path, store, {"Food": 100.0})
+    expense_store.append_journal(journal, [
+        {"expense": {"date": "03-01-2024", "category": "Travel", "amount": 80.0}},
+        {"budget": {"category": "Travel", "amount": 500.0}}])
+    with open(journal, "a") as f:
+        f.write('{"expense": {"date": "03-0')  # torn by a crash
+    loaded, budget = expense_store.read_snapshot(path)
+    assert loaded.to_dicts() == EXPENSES and budget == {"Food": 100.0}
+    assert expense_store.replay_journal(journal, loaded, budget) == 2
+    assert loaded.to_dicts()[3] == {"date": "03-01-2024", "category": "Travel",
+                                    "amount": 80.0, "description": ""}
+    assert budget == {"Food": 100.0, "Travel": 500.0}
+    assert loaded.categories == ["Food", "Rent", "Travel"]
+
+def test_tracker_converts_legacy_file_and_reloads(tmp_path, monkeypatch, capsys):
+    import json
+    import expense_tracker
+    monkeypatch.chdir(tmp_path)
+    for name, value in (("expenses", ExpenseStore()), ("budget", {}), ("journal_entries", 0)):
+        monkeypatch.setattr(expense_tracker, name, value)  # restored after the test
+    (tmp_path / "expenses.json").write_text(json.dumps({"expenses": EXPENSES,
+                                                        "budget": {"Food": 50.0}}))
+    expense_tracker.load_data()
+    assert (tmp_path / "expenses.json.bak").exists() and (tmp_path / "expenses.snapshot").exists()
+    expense_tracker.expenses.add(EXPENSES[0])
+    expense_tracker.journal({"expense": EXPENSES[0]})
+    expense_tracker.expenses, expense_tracker.budget = ExpenseStore(), {}
+    expense_tracker.load_data()
+    assert expense_tracker.expenses.to_dicts() == EXPENSES + EXPENSES[:1]
+    assert expense_tracker.budget == {"Food": 50.0} and expense_tracker.journal_entries == 1
+
+def random_store(n, seed=1):
+    import random
+    from datetime import date
+    rnd = random.Random(seed)
+    base = date(2022, 11, 1).toordinal()
+    store = ExpenseStore()
+    for _ in range(n):
+        # Quarter amounts add up exactly, so sums can be compared with ==
+        store.append(base + rnd.randrange(800), f"c{rnd.randrange(5)}", rnd.randrange(1, 400) / 4)
+    return store, rnd, base
+
+def check_index_against_scan(store, rnd, base):
+    from datetime import date
+    rows = [(store.dates[i], store.categories[store.cats[i]], store.amounts[i])
+            for i in range(len(store))]
+    index = store.index
+    for _ in range(200):
+        lo = base + rnd.randrange(-10, 810)
+        hi = lo + rnd.randrange(0, 200)
+        for cat in (None, "c1", "c4", "missing"):
+            want = sum(a for d, c, a in rows if lo <= d <= hi and cat in (None, c))
+            assert index.spent_between(lo, hi, cat) == want
+        assert sorted(index.rows_between(lo, hi)) == [i for i, (d, _, _) in enumerate(rows)
+                                                      if lo <= d <= hi]
+    assert index.spent_between() == sum(a for _, _, a in rows)
+    dates = list(index.sorted_dates)
+    assert dates == sorted(d for d, _, _ in rows)
+    for cat in (None, "c2"):
+        months, years = {}, {}
+        for d, c, a in rows:
+            if cat in (None, c):
+                day = date.fromordinal(d)
+                key = f"{day.year:04d}-{day.month:02d}"
+                months[key] = months.get(key, 0.0) + a
+                years[day.year] = years.get(day.year, 0.0) + a
+        assert index.monthly(cat) == sorted(months.items())
+        assert index.yearly(cat) == sorted(years.items())
+        assert index.month_total(2023, 2, cat) == months.get("2023-02", 0.0)
+        assert index.year_total(2024, cat) == years.get(2024, 0.0)
+
+def test_date_index_matches_scan(monkeypatch):
+    import expense_store
+    for numpy in (expense_store.np, None):
+        monkeypatch.setattr(expense_store, "np", numpy)
+        store, rnd, base = random_store(3000)
+        check_index_against_scan(store, rnd, base)
+        # Rows appended after the index is built are indexed one by one
+        for _ in range(300):
+            store.append(base + rnd.randrange(800), f"c{rnd.randrange(6)}", rnd.randrange(400) / 4)
+        check_index_against_scan(store, rnd, base)
+
+def write_shards(root):
+    import json
+    import expense_store
+    (root / "team" / "ann").mkdir(parents=True)
+    (root / "team" / "ann" / "expenses.json").write_text(json.dumps({
+        "expenses": [{"date": "06-03-2024", "category": "Food", "amount": 40.0},
+                     {"date": "06-20-2024", "category": "Food", "amount": 30.0},
+                     {"date": "05-31-2024", "category": "Food", "amount": 500.0}],
+        "budget": {"Food": 50.0}}))
+    bob = root / "team" / "bob"
+    bob.mkdir()
+    expense_store.write_snapshot(str(bob / "expenses.snapshot"), ExpenseStore.from_dicts([
+        {"date": "06-01-2024", "category": "Food", "amount": 10.0},
+        {"date": "06-02-2024", "category": "Rent", "amount": 900.0}]), {"Food": 100.0})
+    expense_store.append_journal(str(bob / "expenses.jsonl"), [
+        {"expense": {"date": "06-30-2024", "category": "Food", "amount": 95.0}},
+        {"budget": {"category": "Rent", "amount": 1000.0}}])
+    (root / "carl.json").write_text(json.dumps({
+        "expenses": [{"date": "06-15-2024", "category": "Fun", "amount": 12.5}]}))
+    (root / "broken.json").write_text("{not json")
+
+def test_report_merges_shards(tmp_path, capsys):
+    import json
+    import expense_report
+    write_shards(tmp_path)
+    paths = [str(tmp_path / "team"), str(tmp_path / "carl.json"), str(tmp_path / "broken.json")]
+    assert len(list(expense_report.find_shards(paths))) == 4
+    for workers in ("1", "2"):
+        try:
+            expense_report.main(paths + ["--month", "2024-06", "--workers", workers, "--json",
+                                         "--progress", "0"])
+            assert False, "Expected SystemExit"
+        except SystemExit as e:
+            assert e.code == 1  # broken.json
+        report = json.loads(capsys.readouterr().out)
+        assert (report["users"], report["expenses"]) == (3, 7)
+        assert report["categories"] == {
+            "Food": {"spent": 175.0, "budget": 150.0, "budgeted_users": 2, "over_budget_users": 2},
+            "Fun": {"spent": 12.5, "budget": 0, "budgeted_users": 0, "over_budget_users": 0},
+            "Rent": {"spent": 900.0, "budget": 1000.0, "budgeted_users": 1,
+                     "over_budget_users": 0}}
+        assert list(report["errors"]) == [str(tmp_path / "broken.json")]
+    # A snapshot cut short is reported like any other unreadable shard
+    snapshot = tmp_path / "team" / "bob" / "expenses.snapshot"
+    header = snapshot.read_bytes().split(b"\n", 1)[0]
+    snapshot.write_bytes(snapshot.read_bytes()[:len(header) + 9])  # one of two amounts
+    result = expense_report.aggregate_shard(str(tmp_path / "team" / "bob"), "2024-06")
+    assert result.rows == 0 and result.error.startswith("ValueError")
@@ -0,0 +1,187 @@
+# tests_task_manager.py
+import threading
+
+import task_manager
+from task_manager import TaskSession, UserStore, read_tasks, run_batch
+
+def make_users(tmp_path, monkeypatch, *names):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(task_manager, "KDF_ITERATIONS", 1)
+    users = UserStore(str(tmp_path / "users.db"))
+    for name in names:
+        users.add(name, "pw")
+    users.close()
+
+def test_batches_switching_users_do_not_deadlock(tmp_path, monkeypatch):
+    make_users(tmp_path, monkeypatch, "a", "b")
+    both_started = threading.Barrier(2, timeout=10)
+    failed = []
+
+    def batch(first, second):
+        def lines():
+            yield f"login {first} pw"
+            yield f"add from {first}"
+            both_started.wait()  # each batch now holds its first user's tasks
+            yield f"login {second} pw"
+            yield f"add after {first}"
+        users = UserStore(str(tmp_path / "users.db"))
+        try:
+            failed.append(run_batch(lines(), users))
+        finally:
+            users.close()
+
+    threads = [threading.Thread(target=batch, args=order, daemon=True)
+               for order in (("a", "b"), ("b", "a"))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads), "batches deadlocked"
+    assert failed == [0, 0]
+    assert sorted(task for task, _ in read_tasks("a")[1]) == ["after b", "from a"]
+    assert sorted(task for task, _ in read_tasks("b")[1]) == ["after a", "from b"]
+
+def test_batch_returns_to_earlier_user(tmp_path, monkeypatch):
+    make_users(tmp_path, monkeypatch, "a", "b")
+    users = UserStore(str(tmp_path / "users.db"))
+    lines = ["login a pw", "add one", "login b pw", "add two", "login a pw", "complete 1",
+             "add three", "delete 7"]
+    assert run_batch(lines, users) == 1
+    users.close()
+    assert read_tasks("a")[1] == [("one", "completed"), ("three", "not completed")]
+    with TaskSession("b") as session:
+        assert session.tasks() == [("two", "not completed")]
+
+def test_batch_does_not_hold_users_db(tmp_path, monkeypatch):
+    make_users(tmp_path, monkeypatch, "a")
+    other = UserStore(str(tmp_path / "users.db"))
+    registered = []
+
+    def lines():
+        yield "register b pw"
+        yield "add for b"
+        # Another session registers while this batch is still running
+        registered.append(other.add("c", "pw"))
+        yield "login a wrong"
+        yield "add must not go to b"
+    users = UserStore(str(tmp_path / "users.db"))
+    assert run_batch(lines(), users) == 2
+    users.close()
+    assert registered == [True] and "c" in other
+    other.close()
+    assert read_tasks("b")[1] == [("for b", "not completed")]
+
+def test_import_legacy_resumes(tmp_path, monkeypatch):
+    make_users(tmp_path, monkeypatch)
+    monkeypatch.setattr(task_manager, "IMPORT_CHUNK", 2)
+    (tmp_path / "users.txt").write_text("a,1\nb,2\na,other\nc,3\nd,4\n")
+    hashed = []
+    real_hash = task_manager.hash_password
+
+    def interrupted(password, *args):
+        if len(hashed) == 3:
+            raise KeyboardInterrupt
+        hashed.append(password)
+        return real_hash(password, *args)
+
+    users = UserStore(str(tmp_path / "users.db"))
+    monkeypatch.setattr(task_manager, "hash_password", interrupted)
+    try:
+        users.import_legacy()
+        assert False, "Expected KeyboardInterrupt"
+    except KeyboardInterrupt:
+        pass
+    assert len(users) == 2 and (tmp_path / "users.txt").exists()  # the first chunk is in
+    monkeypatch.setattr(task_manager, "hash_password", real_hash)
+    assert users.import_legacy() == 2
+    assert not (tmp_path / "users.txt").exists()
+    assert users.authenticate("a", "1") and not users.authenticate("a", "other")
+    assert users.authenticate("d", "4")
+    users.close()
+
+def test_users_hash_and_rehash(tmp_path, monkeypatch):
+    make_users(tmp_path, monkeypatch, "alice")
+    users = UserStore(str(tmp_path / "users.db"))
+    assert "alice" in users and "bob" not in users and len(users) == 1
+    stored = users._hash("alice")
+    assert stored.startswith("pbkdf2_sha256$1$") and "pw" not in stored.split("$", 2)[2]
+    assert not users.add("alice", "again")
+    assert users.authenticate("alice", "pw")
+    assert not users.authenticate("alice", "PW") and not users.authenticate("bob", "pw")
+    # A new cost applies at the next successful login
+    monkeypatch.setattr(task_manager, "KDF_ITERATIONS", 2)
+    assert users.authenticate("alice", "pw")
+    assert users._hash("alice").startswith("pbkdf2_sha256$2$")
+    assert users.authenticate("alice", "pw")
+    users.close()
+
+def test_delete_bumps_version_and_stale_changes_conflict(tmp_path, monkeypatch):
+    from task_manager import Conflict, append_task, remove_task, set_status
+    monkeypatch.chdir(tmp_path)
+    for task in ("a", "b", "c"):
+        append_task("u", task)
+    version, tasks = read_tasks("u")
+    append_task("u", "d")  # appends don't move task numbers
+    assert read_tasks("u")[0] == version
+    set_status("u", version, 2)
+    remove_task("u", version, 1)  # another session deletes "a": "c" is now number 2
+    assert read_tasks("u")[0] == version + 1
+    for change in (set_status, remove_task):
+        try:
+            change("u", version, 2)
+            assert False, "Expected Conflict"
+        except Conflict:
+            pass
+    assert read_tasks("u")[1] == [("b", "completed"), ("c", "not completed"),
+                                  ("d", "not completed")]
+    try:
+        set_status("u", version + 1, 4)
+        assert False, "Expected IndexError"
+    except IndexError:
+        pass
+
+def test_record_file_tombstones_and_compaction(tmp_path, monkeypatch):
+    from task_manager import (DELETED, MAGIC, NOT_DONE, _index, _read, _record, compact_tasks,
+                              get_task_file)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(task_manager, "COMPACT_MIN_DEAD", 2)
+    with TaskSession("u") as session:
+        for i in range(4):
+            session.add(f"task {i}")
+    size = (tmp_path / get_task_file("u")).stat().st_size
+    with TaskSession("u") as session:
+        session.remove(2)
+        assert session.tasks()[1] == ("task 2", "not completed")
+    data = _read("u")
+    second = len(MAGIC) + len(_record(NOT_DONE, "task 0"))
+    assert len(data) == size and data[second] == DELETED  # a status byte, not a rewrite
+    assert _index(data)[1] == 1
+    compact_tasks("u")
+    data = _read("u")
+    assert _index(data)[1] == 0 and data.startswith(MAGIC)
+    assert [t for t, _ in read_tasks("u")[1]] == ["task 0", "task 2", "task 3"]
+    # Closing a session with half the records dead compacts the file
+    with TaskSession("u") as session:
+        session.remove(1)
+        session.remove(1)
+    assert _index(_read("u"))[1] == 0 and read_tasks("u")[1] == [("task 3", "not completed")]
+
+def test_torn_record_is_ignored_and_overwritten(tmp_path, monkeypatch):
+    from task_manager import DONE, _record, append_task, get_task_file
+    monkeypatch.chdir(tmp_path)
+    append_task("u", "kept, with comma")
+    with open(get_task_file("u"), "ab") as f:
+        f.write(_record(DONE, "torn by a crash")[:-3])
+    assert read_tasks("u")[1] == [("kept, with comma", "not completed")]
+    append_task("u", "next")
+    assert [t for t, _ in read_tasks("u")[1]] == ["kept, with comma", "next"]
+
+def test_legacy_text_file_is_converted(tmp_path, monkeypatch):
+    from task_manager import get_legacy_task_file, get_task_file
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / get_legacy_task_file("u")).write_text(
+        "Buy milk, eggs,completed\nCall mom,not completed\n\nno comma here\n")
+    assert read_tasks("u")[1] == [("Buy milk, eggs", "completed"), ("Call mom", "not completed"),
+                                  ("no comma here", "not completed")]
+    assert not (tmp_path / get_legacy_task_file("u")).exists()
+    assert (tmp_path / get_task_file("u")).exists()